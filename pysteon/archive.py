@@ -0,0 +1,310 @@
+"""
+Columnar events archive.
+
+An archive is a directory of append-only chunk files. Each chunk holds a
+fixed number of events, stored column by column as little-endian arrays:
+
+- `timestamp`: int64, in microseconds since the epoch;
+- `sender`: uint32, the sender identity;
+- `command`: uint16, the two command bytes;
+- `flags`: uint8, the raw flags byte.
+
+Columns are compressed with zlib, unless the archive is written with
+`compress=False`, in which case chunks can be memory-mapped directly.
+"""
+
+import os
+import struct
+import sys
+import zlib
+
+from array import array
+from collections import namedtuple
+from threading import Lock
+
+from .database import identity_to_key
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+Column = namedtuple('Column', ('name', 'typecode', 'dtype'))
+
+COLUMNS = (
+    Column(name='timestamp', typecode='q', dtype='<i8'),
+    Column(name='sender', typecode='I', dtype='<u4'),
+    Column(name='command', typecode='H', dtype='<u2'),
+    Column(name='flags', typecode='B', dtype='<u1'),
+)
+
+# The magic, the format version, the compression flag, the number of events
+# and the size of each column.
+CHUNK_HEADER = struct.Struct('<4sBB2xI4x%dQ' % len(COLUMNS))
+CHUNK_MAGIC = b'PSTA'
+CHUNK_VERSION = 1
+CHUNK_EXTENSION = '.chunk'
+
+# Columns are aligned so that they can be memory-mapped.
+ALIGNMENT = 8
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def write_chunk(path, columns, compress=True):
+    """
+    Write a chunk file.
+
+    The chunk is written to a temporary file first, so that readers never
+    see a partial chunk.
+
+    :param path: The path of the chunk file.
+    :param columns: A dict of `array.array` by column name.
+    :param compress: A flag that if set, causes the columns to be compressed.
+    """
+    count = len(columns[COLUMNS[0].name])
+    payloads = []
+
+    for column in COLUMNS:
+        values = columns[column.name]
+
+        if sys.byteorder == 'big':
+            values = array(values.typecode, values)
+            values.byteswap()
+
+        payload = values.tobytes()
+
+        if compress:
+            payload = zlib.compress(payload)
+
+        payloads.append(payload)
+
+    temporary_path = path + '.tmp'
+
+    with open(temporary_path, 'wb') as chunk_file:
+        chunk_file.write(CHUNK_HEADER.pack(
+            CHUNK_MAGIC,
+            CHUNK_VERSION,
+            int(compress),
+            count,
+            *map(len, payloads)
+        ))
+
+        for payload in payloads:
+            chunk_file.write(payload)
+            chunk_file.write(bytes(_padding(len(payload))))
+
+    os.replace(temporary_path, path)
+
+
+def read_chunk(path):
+    """
+    Read a chunk file.
+
+    :param path: The path of the chunk file.
+    :returns: A dict of columns by name. Columns are NumPy arrays if NumPy is
+        installed, memory-mapped if the chunk is not compressed. Otherwise,
+        they are `array.array` instances.
+    """
+    with open(path, 'rb') as chunk_file:
+        header = CHUNK_HEADER.unpack(chunk_file.read(CHUNK_HEADER.size))
+        magic, version, compressed, count = header[:4]
+        sizes = header[4:]
+
+        if magic != CHUNK_MAGIC or version != CHUNK_VERSION:
+            raise ValueError("%s is not a valid chunk file" % path)
+
+        columns = {}
+        offset = CHUNK_HEADER.size
+
+        for column, size in zip(COLUMNS, sizes):
+            if numpy is not None and not compressed:
+                columns[column.name] = numpy.memmap(
+                    path,
+                    dtype=column.dtype,
+                    mode='r',
+                    offset=offset,
+                    shape=(count,),
+                )
+            else:
+                chunk_file.seek(offset)
+                payload = chunk_file.read(size)
+
+                if compressed:
+                    payload = zlib.decompress(payload)
+
+                if numpy is not None:
+                    columns[column.name] = numpy.frombuffer(
+                        payload,
+                        dtype=column.dtype,
+                    )
+                else:
+                    values = array(column.typecode)
+                    values.frombytes(payload)
+
+                    if sys.byteorder == 'big':
+                        values.byteswap()
+
+                    columns[column.name] = values
+
+            offset += size + _padding(size)
+
+    return columns
+
+
+class ArchiveWriter(object):
+    """
+    Appends events to an archive.
+
+    Events are buffered in memory and written as a new chunk every
+    `chunk_size` events. Calling `flush` writes the buffered events to a
+    partial chunk, which is rewritten by the next calls until it is full.
+    A new writer resumes filling the last partial chunk of the archive.
+
+    Writers are thread-safe.
+    """
+
+    def __init__(self, path, chunk_size=65536, compress=True):
+        """
+        :param path: The path of the archive directory. It is created if it
+            does not exist.
+        :param chunk_size: The number of events per chunk.
+        :param compress: A flag that if set, causes the chunks to be
+            compressed.
+        """
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self._lock = Lock()
+        self._columns = self._create_columns()
+        self._flushed = True
+        self._next_index = max(
+            (
+                int(os.path.splitext(name)[0]) + 1
+                for name in os.listdir(path)
+                if name.endswith(CHUNK_EXTENSION)
+            ),
+            default=0,
+        )
+
+        if self._next_index:
+            self._resume_chunk()
+
+    def append_events(self, events):
+        """
+        Append events to the archive.
+
+        :param events: An iterable of `DatabaseEvent`.
+        """
+        with self._lock:
+            for event in events:
+                self._columns['timestamp'].append(
+                    int(event.timestamp * 1000000),
+                )
+                self._columns['sender'].append(identity_to_key(event.sender))
+                self._columns['command'].append(
+                    int.from_bytes(event.command_bytes, 'big'),
+                )
+                self._columns['flags'].append(event.flags_byte)
+                self._flushed = False
+
+                if len(self._columns['timestamp']) >= self.chunk_size:
+                    self._write_chunk()
+
+    def flush(self):
+        """
+        Write the buffered events, if any, to the current chunk.
+        """
+        with self._lock:
+            if not self._flushed:
+                self._write_chunk()
+
+    # Private methods below.
+
+    @staticmethod
+    def _create_columns():
+        return {column.name: array(column.typecode) for column in COLUMNS}
+
+    def _get_chunk_path(self, index):
+        return os.path.join(self.path, '%010d%s' % (index, CHUNK_EXTENSION))
+
+    def _resume_chunk(self):
+        index = self._next_index - 1
+
+        try:
+            columns = read_chunk(self._get_chunk_path(index))
+        except ValueError:
+            return
+
+        if len(columns[COLUMNS[0].name]) < self.chunk_size:
+            self._columns = {
+                column.name: array(
+                    column.typecode,
+                    columns[column.name].tolist(),
+                )
+                for column in COLUMNS
+            }
+            self._next_index = index
+
+    def _write_chunk(self):
+        write_chunk(
+            self._get_chunk_path(self._next_index),
+            self._columns,
+            compress=self.compress,
+        )
+        self._flushed = True
+
+        if len(self._columns[COLUMNS[0].name]) >= self.chunk_size:
+            self._columns = self._create_columns()
+            self._next_index += 1
+
+
+class ArchiveReader(object):
+    """
+    Reads the events of an archive.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path of the archive directory.
+        """
+        self.path = path
+
+    def get_chunk_paths(self):
+        """
+        Get the paths of the chunk files, in order.
+
+        :returns: A list of paths.
+        """
+        if not os.path.isdir(self.path):
+            return []
+
+        return [
+            os.path.join(self.path, name)
+            for name in sorted(os.listdir(self.path))
+            if name.endswith(CHUNK_EXTENSION)
+        ]
+
+    def read_columns(self):
+        """
+        Read all the events of the archive. Requires NumPy.
+
+        :returns: A dict of NumPy arrays by column name.
+        """
+        if numpy is None:
+            raise RuntimeError("Reading an archive requires NumPy.")
+
+        chunks = list(map(read_chunk, self.get_chunk_paths()))
+
+        return {
+            column.name: numpy.concatenate(
+                [chunk[column.name] for chunk in chunks] or
+                [numpy.empty(0, dtype=column.dtype)],
+            )
+            for column in COLUMNS
+        }
@@ -2,6 +2,7 @@
 Automation primitives.
 """
 
+import asyncio
 import importlib
 
 from functools import wraps
@@ -10,15 +11,43 @@ from chromalog.mark.helpers.simple import (
     important,
 )
 
+from ..exceptions import CommandTimeout
 from ..objects import (
     DeviceCategory,
     SecurityHealthSafetySubcatory,
 )
 from ..log import logger
+from .rules import RuleIndex
+from .scheduler import Scheduler
+
+# The timeout of the callbacks that do not specify one: it means the
+# `callback_timeout` of the `Automate` instance.
+DEFAULT_TIMEOUT = object()
 
 
 class Automate(object):
-    def __init__(self, plm, database, loop):
+    """
+    Runs the automation callbacks registered by modules.
+
+    All the callbacks matching an event or a state change run concurrently.
+    Callbacks registered with the same `ordering_group` never run
+    concurrently: they run one after the other, in the order of the events
+    and of their registration. A callback that fails or exceeds its timeout
+    is logged and does not affect the others.
+
+    Modules can schedule their own callbacks with `call_at`, `call_later`
+    and `call_cron`, instead of running tasks that sleep.
+    """
+
+    def __init__(self, plm, database, loop, callback_timeout=None):
+        """
+        :param plm: The `PowerLineModem` instance.
+        :param database: The `AsyncDatabase` instance.
+        :param loop: The event loop.
+        :param callback_timeout: The default time, in seconds, a callback
+            can run before being cancelled. If `None`, callbacks never time
+            out unless they specify a timeout.
+        """
         self.state = 'initial'
         self.modules = []
         self.on_state_changed_callbacks = []
@@ -26,7 +55,11 @@ class Automate(object):
         self.plm = plm
         self.database = database
         self.loop = loop
+        self.callback_timeout = callback_timeout
+        self.scheduler = Scheduler(loop=loop)
         self._registration_data = []
+        self._event_rules = None
+        self._ordering_locks = {}
 
     def load_module(self, module):
         self.modules.append(importlib.import_module(module))
@@ -37,10 +70,152 @@ class Automate(object):
             data = await module.register(automate=self)
             self._registration_data.append(data)
 
+        self._event_rules = None
+
     async def __aexit__(self, *args):
         for module, data in zip(self.modules, self._registration_data):
             await module.unregister(automate=self, data=data)
 
+        self._event_rules = None
+        self.scheduler.close()
+
+    def remove_callback(self, func):
+        """
+        Remove a callback registered with one of the `fire_on_*` decorators.
+
+        :param func: The callback to remove.
+        """
+        self.on_state_changed_callbacks[:] = [
+            (attrs, callback)
+            for attrs, callback in self.on_state_changed_callbacks
+            if callback is not func
+        ]
+        self.on_event_callbacks[:] = [
+            (attrs, callback)
+            for attrs, callback in self.on_event_callbacks
+            if callback is not func
+        ]
+        self._event_rules = None
+
+    def debounce(self, seconds):
+        """
+        Decorator that delays a callback until its triggers stop for a given
+        time, and then calls it once with the arguments of the last trigger.
+
+        Triggers are grouped by device and group. Apply it below the
+        `fire_on_*` decorator.
+
+        :param seconds: The time, in seconds, without triggers after which the
+            callback is called.
+        """
+        def decorator(func):
+            # The timer and the arguments of the last trigger, by key.
+            pending = {}
+
+            def fire(key):
+                _, kwargs = pending.pop(key)
+
+                return self._call(func, self.callback_timeout, kwargs)
+
+            @wraps(func)
+            async def wrapper(**kwargs):
+                key = self._get_trigger_key(kwargs)
+
+                if key in pending:
+                    timer = pending[key][0]
+                    timer.rearm(seconds)
+                else:
+                    timer = self.scheduler.call_later(seconds, fire, key)
+
+                pending[key] = (timer, kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def throttle(self, rate):
+        """
+        Decorator that limits the rate at which a callback is called.
+
+        A trigger calls the callback right away unless it was called less
+        than `1 / rate` seconds ago. In that case, the callback is called
+        once that time has elapsed, with the arguments of the last trigger.
+
+        Triggers are grouped by device and group. Apply it below the
+        `fire_on_*` decorator.
+
+        :param rate: The maximum number of calls per second.
+        """
+        interval = 1.0 / rate
+
+        def decorator(func):
+            # The time of the next allowed call and the arguments of the
+            # delayed trigger, if any, by key.
+            states = {}
+
+            def fire(key):
+                state = states[key]
+                kwargs, state[1] = state[1], None
+                state[0] = self.loop.time() + interval
+
+                return self._call(func, self.callback_timeout, kwargs)
+
+            @wraps(func)
+            async def wrapper(**kwargs):
+                key = self._get_trigger_key(kwargs)
+                now = self.loop.time()
+                state = states.get(key)
+
+                if state is None or (state[1] is None and now >= state[0]):
+                    states[key] = [now + interval, None]
+                    await func(**kwargs)
+                else:
+                    if state[1] is None:
+                        self.scheduler.call_at(state[0], fire, key)
+
+                    state[1] = kwargs
+
+            return wrapper
+
+        return decorator
+
+    def call_at(self, when, callback, *args):
+        """
+        Call a callback at a given time.
+
+        :param when: The time, relative to the event loop clock.
+        :param callback: The callable. If it returns a coroutine, the
+            coroutine is run in a new task.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance, that can be cancelled or rearmed.
+        """
+        return self.scheduler.call_at(when, callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        """
+        Call a callback after a delay.
+
+        :param delay: The delay, in seconds.
+        :param callback: The callable. If it returns a coroutine, the
+            coroutine is run in a new task.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance, that can be cancelled or rearmed.
+        """
+        return self.scheduler.call_later(delay, callback, *args)
+
+    def call_cron(self, expression, callback, *args):
+        """
+        Call a callback at the times matching a cron expression.
+
+        :param expression: The cron expression (e.g. `'30 7 * * mon-fri'`),
+            in local time.
+        :param callback: The callable. If it returns a coroutine, the
+            coroutine is run in a new task.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance. Cancelling it stops the calls.
+        """
+        return self.scheduler.call_cron(expression, callback, *args)
+
     @staticmethod
     def in_list(value, choices):
         return not choices or value in choices
@@ -49,42 +224,63 @@ class Automate(object):
         if new_state != self.state:
             old_state, self.state = self.state, new_state
 
-            for attrs, callback in self.on_state_changed_callbacks:
-                from_states = attrs['from_states']
-                to_states = attrs['to_states']
-
-                if self.in_list(old_state, attrs['from_states']):
-                    if self.in_list(new_state, attrs['to_states']):
-                        await callback(old_state=old_state, new_state=new_state)
+            await self._run_callbacks(
+                [
+                    (attrs, callback)
+                    for attrs, callback in self.on_state_changed_callbacks
+                    if self.in_list(old_state, attrs['from_states']) and
+                    self.in_list(new_state, attrs['to_states'])
+                ],
+                old_state=old_state,
+                new_state=new_state,
+            )
 
     async def handle_message(self, msg):
-        device = self.database.get_device(msg.sender)
+        device = await self.database.get_device(msg.sender)
 
         if not device:
             return
 
-        for attrs, callback in self.on_event_callbacks:
-            if all([
-                self.in_list(device.category, attrs['device_categories']),
-                self.in_list(
-                    device.subcategory,
-                    attrs['device_subcategories'],
-                ),
-                self.in_list(msg.command_bytes[0], attrs['commands']),
-                self.in_list(msg.command_bytes[1], attrs['groups']),
-            ]):
-                await callback(
-                    device=device,
-                    command=msg.command_bytes[0],
-                    group=msg.command_bytes[1],
+        if self._event_rules is None:
+            self._event_rules = RuleIndex([
+                (
+                    (
+                        attrs['device_categories'],
+                        attrs['device_subcategories'],
+                        attrs['commands'],
+                        attrs['groups'],
+                    ),
+                    (attrs, callback),
                 )
+                for attrs, callback in self.on_event_callbacks
+            ])
 
-    def fire_on_state_changed(self, from_states=None, to_states=None):
+        await self._run_callbacks(
+            self._event_rules.match((
+                device.category,
+                device.subcategory,
+                msg.command_bytes[0],
+                msg.command_bytes[1],
+            )),
+            device=device,
+            command=msg.command_bytes[0],
+            group=msg.command_bytes[1],
+        )
+
+    def fire_on_state_changed(
+        self,
+        from_states=None,
+        to_states=None,
+        timeout=DEFAULT_TIMEOUT,
+        ordering_group=None,
+    ):
         def decorator(func):
             self.on_state_changed_callbacks.append((
                 {
                     'from_states': from_states,
                     'to_states': to_states,
+                    'timeout': timeout,
+                    'ordering_group': ordering_group,
                 },
                 func,
             ))
@@ -99,6 +295,8 @@ class Automate(object):
         device_subcategories=None,
         commands=None,
         groups=None,
+        timeout=DEFAULT_TIMEOUT,
+        ordering_group=None,
     ):
         def decorator(func):
             self.on_event_callbacks.append((
@@ -107,76 +305,162 @@ class Automate(object):
                     'device_subcategories': device_subcategories,
                     'commands': commands,
                     'groups': groups,
+                    'timeout': timeout,
+                    'ordering_group': ordering_group,
                 },
                 func,
             ))
+            self._event_rules = None
 
             return func
 
         return decorator
 
-    def fire_on_motion_sensor_activated(self):
+    def fire_on_motion_sensor_activated(self, **kwargs):
         return self.fire_on_event(
             device_categories=[DeviceCategory.security_health_safety],
             device_subcategories=[SecurityHealthSafetySubcatory.motion_sensor],
             commands=[0x11, 0x12],
+            **kwargs
         )
 
-    def fire_on_motion_sensor_deactivated(self):
+    def fire_on_motion_sensor_deactivated(self, **kwargs):
         return self.fire_on_event(
             device_categories=[DeviceCategory.security_health_safety],
             device_subcategories=[SecurityHealthSafetySubcatory.motion_sensor],
             commands=[0x13, 0x14],
+            **kwargs
         )
 
-    def fire_on_open_close_sensor_opened(self):
+    def fire_on_open_close_sensor_opened(self, **kwargs):
         return self.fire_on_event(
             device_categories=[DeviceCategory.security_health_safety],
             device_subcategories=[
                 SecurityHealthSafetySubcatory.open_close_sensor,
             ],
             commands=[0x11, 0x12],
+            **kwargs
         )
 
-    def fire_on_open_close_sensor_closed(self):
+    def fire_on_open_close_sensor_closed(self, **kwargs):
         return self.fire_on_event(
             device_categories=[DeviceCategory.security_health_safety],
             device_subcategories=[
                 SecurityHealthSafetySubcatory.open_close_sensor,
             ],
             commands=[0x13, 0x14],
+            **kwargs
         )
 
-    def fire_on_light_turned_on(self):
+    def fire_on_light_turned_on(self, **kwargs):
         return self.fire_on_event(
             device_categories=[
                 DeviceCategory.dimmable_lighting_control,
                 DeviceCategory.switched_lighting_control,
             ],
             commands=[0x11, 0x12],
+            **kwargs
         )
 
-    def fire_on_light_turned_off(self):
+    def fire_on_light_turned_off(self, **kwargs):
         return self.fire_on_event(
             device_categories=[
                 DeviceCategory.dimmable_lighting_control,
                 DeviceCategory.switched_lighting_control,
             ],
             commands=[0x13, 0x14],
+            **kwargs
         )
 
-    def fire_on_remote_pressed_on(self, groups=None):
+    def fire_on_remote_pressed_on(self, groups=None, **kwargs):
         return self.fire_on_event(
             device_categories=[
                 DeviceCategory.generalized_controllers,
             ],
             commands=[0x11, 0x12],
+            **kwargs
         )
 
-    def fire_on_remote_pressed_off(self, groups=None):
+    def fire_on_remote_pressed_off(self, groups=None, **kwargs):
         return self.fire_on_event(
             device_categories=[
                 DeviceCategory.generalized_controllers,
             ],
             commands=[0x13, 0x14],
+            **kwargs
         )
+
+    # Private methods below.
+
+    @staticmethod
+    def _get_trigger_key(kwargs):
+        device = kwargs.get('device')
+
+        return (device.identity if device else None, kwargs.get('group'))
+
+    async def _run_callbacks(self, callbacks, **kwargs):
+        if len(callbacks) == 1:
+            await self._run_callback(*callbacks[0], kwargs=kwargs)
+        elif callbacks:
+            # Tasks are created explicitly so that they start in registration
+            # order, which ordering groups rely on.
+            await asyncio.gather(
+                *[
+                    asyncio.ensure_future(
+                        self._run_callback(attrs, callback, kwargs=kwargs),
+                        loop=self.loop,
+                    )
+                    for attrs, callback in callbacks
+                ],
+                loop=self.loop
+            )
+
+    async def _run_callback(self, attrs, callback, kwargs):
+        ordering_group = attrs.get('ordering_group')
+        timeout = attrs.get('timeout', DEFAULT_TIMEOUT)
+
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.callback_timeout
+
+        if ordering_group is not None:
+            lock = self._ordering_locks.get(ordering_group)
+
+            if lock is None:
+                lock = self._ordering_locks[ordering_group] = asyncio.Lock(
+                    loop=self.loop,
+                )
+
+            async with lock:
+                await self._call(callback, timeout, kwargs)
+        else:
+            await self._call(callback, timeout, kwargs)
+
+    async def _call(self, callback, timeout, kwargs):
+        try:
+            if timeout is None:
+                await callback(**kwargs)
+            else:
+                await asyncio.wait_for(
+                    callback(**kwargs),
+                    timeout,
+                    loop=self.loop,
+                )
+        except CommandTimeout:
+            logger.exception(
+                "A PLM command timed out in automation callback %s.",
+                callback.__name__,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Automation callback %s did not complete within %s "
+                "second(s) and was cancelled.",
+                callback.__name__,
+                timeout,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(
+                "Unexpected error in automation callback %s.",
+                callback.__name__,
+            )
@@ -0,0 +1,185 @@
+"""
+Cron expressions.
+"""
+
+from datetime import timedelta
+
+MONTH_NAMES = {
+    name: index + 1
+    for index, name in enumerate((
+        'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+        'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    ))
+}
+WEEKDAY_NAMES = {
+    name: index
+    for index, name in enumerate((
+        'sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat',
+    ))
+}
+
+# The name, bounds and value names of each field.
+FIELDS = (
+    ('minute', 0, 59, {}),
+    ('hour', 0, 23, {}),
+    ('day', 1, 31, {}),
+    ('month', 1, 12, MONTH_NAMES),
+    ('weekday', 0, 7, WEEKDAY_NAMES),
+)
+
+# Schedules such as "every February 29th on a Monday" may not match for
+# years.
+MAX_YEARS = 30
+
+
+def parse_field(field, minimum, maximum, names):
+    """
+    Parse a cron field.
+
+    :param field: The field, as a comma-separated list of values, ranges
+        (`a-b`) or `*`, each optionally followed by a step (`/n`).
+    :param minimum: The minimum value.
+    :param maximum: The maximum value.
+    :param names: A dict of values by name.
+    :returns: A frozenset of values.
+    """
+    def parse_value(value):
+        value = value.lower()
+
+        if value in names:
+            return names[value]
+
+        result = int(value)
+
+        if not minimum <= result <= maximum:
+            raise ValueError(
+                "%s is not in range %s-%s" % (result, minimum, maximum),
+            )
+
+        return result
+
+    values = set()
+
+    for part in field.split(','):
+        range_, _, step = part.partition('/')
+        step = int(step) if step else 1
+
+        if step < 1:
+            raise ValueError("Invalid step in %r" % part)
+
+        if range_ == '*':
+            start, stop = minimum, maximum
+        else:
+            start, _, stop = range_.partition('-')
+            start = parse_value(start)
+
+            if stop:
+                stop = parse_value(stop)
+            elif step > 1:
+                stop = maximum
+            else:
+                stop = start
+
+            if start > stop:
+                raise ValueError("Invalid range %r" % range_)
+
+        values.update(range(start, stop + 1, step))
+
+    return frozenset(values)
+
+
+class CronExpression(object):
+    """
+    A cron expression, made of five fields: minute, hour, day of month, month
+    and day of week (0 or 7 is Sunday).
+
+    As with cron, when both the day of month and the day of week are
+    restricted, a day matches if either of them matches.
+    """
+
+    def __init__(self, expression):
+        """
+        :param expression: The cron expression, as a string.
+        """
+        fields = expression.split()
+
+        if len(fields) != len(FIELDS):
+            raise ValueError(
+                "A cron expression must have %s fields: %r" % (
+                    len(FIELDS),
+                    expression,
+                ),
+            )
+
+        self.expression = expression
+        (
+            self.minutes,
+            self.hours,
+            self.days,
+            self.months,
+            weekdays,
+        ) = (
+            parse_field(field, minimum, maximum, names)
+            for field, (_, minimum, maximum, names) in zip(fields, FIELDS)
+        )
+
+        if 7 in weekdays:
+            weekdays = (weekdays - {7}) | {0}
+
+        self.weekdays = weekdays
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def __repr__(self):
+        return 'CronExpression(%r)' % self.expression
+
+    def matches_date(self, date):
+        """
+        Check whether a date matches the day of month, month and day of week
+        fields.
+
+        :param date: The date.
+        :returns: A boolean.
+        """
+        if date.month not in self.months:
+            return False
+
+        day = date.day in self.days
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+
+        if self._any_day:
+            return weekday
+        elif self._any_weekday:
+            return day
+
+        return day or weekday
+
+    def get_next(self, after):
+        """
+        Get the next time matching the expression.
+
+        :param after: A naive `datetime`.
+        :returns: The first naive `datetime` strictly after `after` that
+            matches the expression.
+        """
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + MAX_YEARS
+
+        # Skip whole months, days and hours that cannot match, so that only a
+        # few iterations are needed.
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                moment = (
+                    moment.replace(day=1, hour=0, minute=0) +
+                    timedelta(days=32)
+                ).replace(day=1)
+            elif not self.matches_date(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError("%r never matches." % self.expression)
@@ -4,6 +4,8 @@ Automation default script.
 
 import asyncio
 
+from chromalog.mark.helpers.simple import important
+
 from ..log import logger
 from ..objects import (
     DeviceCategory,
@@ -0,0 +1,60 @@
+"""
+Automation rules matching.
+"""
+
+from itertools import product
+from operator import itemgetter
+
+
+class RuleIndex(object):
+    """
+    An index of rules that finds the rules matching a set of values with a
+    few dictionary lookups, regardless of the number of rules.
+
+    Each rule has a list of accepted values per field. An empty or `None`
+    list accepts any value.
+    """
+
+    def __init__(self, rules):
+        """
+        :param rules: A list of (conditions, callback) tuples, where
+            `conditions` is a sequence holding the accepted values for each
+            field.
+        """
+        self._rules = {}
+        self._patterns = set()
+
+        for order, (conditions, callback) in enumerate(rules):
+            choices = [
+                tuple(set(values)) if values else (None,)
+                for values in conditions
+            ]
+
+            # Remember which combinations of wildcard fields are in use, so
+            # that lookups only probe those.
+            self._patterns.add(tuple(values == (None,) for values in choices))
+
+            for key in product(*choices):
+                self._rules.setdefault(key, []).append((order, callback))
+
+    def match(self, values):
+        """
+        Get the callbacks of the rules matching the specified values.
+
+        :param values: A sequence holding a value for each field.
+        :returns: The list of matching callbacks, in rules order.
+        """
+        matches = []
+
+        for pattern in self._patterns:
+            matches.extend(self._rules.get(
+                tuple(
+                    None if wildcard else value
+                    for wildcard, value in zip(pattern, values)
+                ),
+                (),
+            ))
+
+        matches.sort(key=itemgetter(0))
+
+        return [callback for _, callback in matches]
@@ -0,0 +1,276 @@
+"""
+Automation timers.
+"""
+
+import asyncio
+import heapq
+import time
+
+from datetime import datetime
+from itertools import count
+
+from .cron import CronExpression
+from ..log import logger
+
+# Cancelled and moved timers leave stale entries in the heap. The heap is
+# rebuilt when they are more than half of it, and at least this many.
+COMPACTION_THRESHOLD = 256
+
+
+class Timer(object):
+    """
+    A timer scheduled by a `Scheduler`.
+
+    Timers can be cancelled, and moved with `reschedule` or `rearm`, which
+    also schedules them again once they fired or were cancelled: a timeout
+    that is rearmed on every trigger only expires after the last one.
+    """
+    __slots__ = (
+        'scheduler',
+        'callback',
+        'args',
+        'when',
+        'cron',
+        'occurrence',
+        '_sequence',
+        '_generation',
+    )
+
+    def __init__(self, scheduler, callback, args, cron=None):
+        self.scheduler = scheduler
+        self.callback = callback
+        self.args = args
+        self.when = None
+        self.cron = cron
+        self.occurrence = None
+        self._sequence = None
+        self._generation = 0
+
+    def __repr__(self):
+        return '<Timer when=%s callback=%s%s%s>' % (
+            '%.3f' % self.when if self.when is not None else None,
+            getattr(self.callback, '__name__', self.callback),
+            ' cron=%r' % self.cron.expression if self.cron else '',
+            '' if self.pending else ' inactive',
+        )
+
+    @property
+    def pending(self):
+        """
+        Whether the timer is scheduled.
+        """
+        return self._sequence is not None
+
+    def cancel(self):
+        """
+        Cancel the timer. Cancelling an inactive timer does nothing.
+        """
+        self.scheduler._cancel(self)
+
+    def reschedule(self, when):
+        """
+        Move the timer to a given time, scheduling it again if it is not
+        pending anymore.
+
+        :param when: The time, relative to the event loop clock.
+        """
+        self.scheduler._schedule(self, when)
+
+    def rearm(self, delay):
+        """
+        Move the timer to a delay from now, scheduling it again if it is not
+        pending anymore.
+
+        :param delay: The delay, in seconds.
+        """
+        self.reschedule(self.scheduler.loop.time() + delay)
+
+
+class Scheduler(object):
+    """
+    Runs callbacks at given times.
+
+    All the timers are kept in a single heap, and a single event loop timer
+    is armed for the earliest of them: pending timers cost no task at all.
+    Postponing a timer does not touch the heap: its entry is only pushed back
+    once it pops.
+
+    Callbacks are called on the event loop. If a callback returns a
+    coroutine, it is run in a new task.
+    """
+
+    def __init__(self, loop):
+        """
+        :param loop: The event loop.
+        """
+        self.loop = loop
+        self._entries = []
+        self._stale = 0
+        self._sequence = count()
+        self._handle = None
+        self._handle_when = None
+
+    def __len__(self):
+        return len(self._entries) - self._stale
+
+    def close(self):
+        """
+        Cancel all the timers.
+        """
+        for _, _, timer in self._entries:
+            timer._sequence = None
+            timer._generation += 1
+
+        self._entries = []
+        self._stale = 0
+        self._disarm()
+
+    def call_at(self, when, callback, *args):
+        """
+        Call a callback at a given time.
+
+        :param when: The time, relative to the event loop clock.
+        :param callback: The callable.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance.
+        """
+        timer = Timer(scheduler=self, callback=callback, args=args)
+        self._schedule(timer, when)
+
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        """
+        Call a callback after a delay.
+
+        :param delay: The delay, in seconds.
+        :param callback: The callable.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance.
+        """
+        return self.call_at(self.loop.time() + delay, callback, *args)
+
+    def call_cron(self, expression, callback, *args):
+        """
+        Call a callback repeatedly, at the times matching a cron expression.
+
+        :param expression: The cron expression, as a string or a
+            `CronExpression` instance. Times are in local time.
+        :param callback: The callable.
+        :param args: The arguments for `callback`.
+        :returns: A `Timer` instance. Cancelling it stops the calls.
+        """
+        if not isinstance(expression, CronExpression):
+            expression = CronExpression(expression)
+
+        timer = Timer(
+            scheduler=self,
+            callback=callback,
+            args=args,
+            cron=expression,
+        )
+        self._schedule_occurrence(timer, datetime.now())
+
+        return timer
+
+    # Private methods below.
+
+    def _schedule(self, timer, when):
+        timer._generation += 1
+
+        if timer.pending:
+            if when >= timer.when:
+                timer.when = when
+                return
+
+            self._stale += 1
+
+        self._push(timer, when)
+
+        if self._handle_when is None or when < self._handle_when:
+            self._arm(when)
+
+    def _schedule_occurrence(self, timer, after):
+        timer.occurrence = timer.cron.get_next(after)
+        delay = timer.occurrence.timestamp() - time.time()
+        self._schedule(timer, self.loop.time() + delay)
+
+    def _cancel(self, timer):
+        timer._generation += 1
+
+        if timer.pending:
+            timer._sequence = None
+            self._stale += 1
+
+            if self._stale >= COMPACTION_THRESHOLD and \
+                    self._stale * 2 > len(self._entries):
+                self._compact()
+
+    def _compact(self):
+        self._entries = [
+            entry for entry in self._entries
+            if entry[1] == entry[2]._sequence
+        ]
+        heapq.heapify(self._entries)
+        self._stale = 0
+
+    def _push(self, timer, when):
+        timer.when = when
+        timer._sequence = next(self._sequence)
+        heapq.heappush(self._entries, (when, timer._sequence, timer))
+
+    def _arm(self, when):
+        self._disarm()
+        self._handle_when = when
+        self._handle = self.loop.call_at(when, self._on_timer)
+
+    def _disarm(self):
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+            self._handle_when = None
+
+    def _on_timer(self):
+        # The event loop may run the handle slightly before its deadline.
+        now = max(self.loop.time(), self._handle_when)
+        self._handle = None
+        self._handle_when = None
+
+        # Timers scheduled by the callbacks for the current time must wait
+        # for the next iteration.
+        timers = []
+
+        while self._entries and self._entries[0][0] <= now:
+            when, sequence, timer = heapq.heappop(self._entries)
+
+            if sequence != timer._sequence:
+                self._stale -= 1
+            elif when < timer.when:
+                self._push(timer, timer.when)
+            else:
+                timer._sequence = None
+                timers.append((timer, timer._generation))
+
+        for timer, generation in timers:
+            # A previous callback may have cancelled or moved the timer.
+            if timer._generation == generation:
+                self._run(timer)
+
+                if timer.cron and timer._generation == generation:
+                    self._schedule_occurrence(
+                        timer,
+                        max(datetime.now(), timer.occurrence),
+                    )
+
+        if self._entries and self._handle_when != self._entries[0][0]:
+            self._arm(self._entries[0][0])
+
+    def _run(self, timer):
+        try:
+            result = timer.callback(*timer.args)
+        except Exception:
+            logger.exception("Unexpected error in timer %r.", timer)
+            return
+
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(result, loop=self.loop)
@@ -2,16 +2,49 @@
 Database utilities.
 """
 
+import asyncio
 import sqlite3
+import time
 
-from collections import namedtuple
-from itertools import chain
+from collections import (
+    OrderedDict,
+    namedtuple,
+)
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import (
+    Lock,
+    local,
+)
 
+from pysteon.log import logger as main_logger
 from pysteon.objects import (
     Identity,
     parse_device_categories,
 )
 
+logger = main_logger.getChild('database')
+
+
+def identity_to_key(identity):
+    """
+    Convert an identity to its database key.
+
+    :param identity: The `Identity`.
+    :returns: The identity as a 24-bit integer.
+    """
+    return int.from_bytes(identity, 'big')
+
+
+def identity_from_key(key):
+    """
+    Convert a database key to an identity.
+
+    :param key: The identity as a 24-bit integer.
+    :returns: The `Identity`.
+    """
+    return Identity(key.to_bytes(3, 'big'))
+
 
 class DatabaseDevice(namedtuple('_DatabaseDevice', (
     'identity',
@@ -26,7 +59,7 @@ class DatabaseDevice(namedtuple('_DatabaseDevice', (
         category, subcategory = parse_device_categories(bytes(row[3:5]))
 
         return cls(
-            identity=Identity.from_string(row[0]),
+            identity=identity_from_key(row[0]),
             alias=row[1],
             description=row[2],
             category=category,
@@ -36,7 +69,7 @@ class DatabaseDevice(namedtuple('_DatabaseDevice', (
 
     def to_row(self):
         return (
-            str(self.identity),
+            identity_to_key(self.identity),
             self.alias,
             self.description,
             self.category.value,
@@ -59,46 +92,359 @@ class DatabaseDevice(namedtuple('_DatabaseDevice', (
         return self.description if self.description else self.name
 
 
+class DatabaseEvent(namedtuple('_DatabaseEvent', (
+    'timestamp',
+    'sender',
+    'target',
+    'command_bytes',
+    'flags_byte',
+    'hops_left',
+    'user_data',
+))):
+    @classmethod
+    def from_insteon_message(cls, timestamp, insteon_message):
+        return cls(
+            timestamp=timestamp,
+            sender=insteon_message.sender,
+            target=insteon_message.target,
+            command_bytes=insteon_message.command_bytes,
+            flags_byte=insteon_message.flags_byte,
+            hops_left=insteon_message.hops_left,
+            user_data=insteon_message.user_data,
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            timestamp=row[0],
+            sender=identity_from_key(row[1]),
+            target=identity_from_key(row[2]),
+            command_bytes=bytes(row[3:5]),
+            flags_byte=row[5],
+            hops_left=row[6],
+            user_data=row[7] or b'',
+        )
+
+    def to_row(self):
+        return (
+            self.timestamp,
+            identity_to_key(self.sender),
+            identity_to_key(self.target),
+            self.command_bytes[0],
+            self.command_bytes[1],
+            self.flags_byte,
+            self.hops_left,
+            self.user_data or None,
+        )
+
+
+class DeviceCache(object):
+    """
+    A bounded LRU cache of devices by identity.
+
+    The cache also remembers, for a limited time, that an identity is
+    unknown.
+    """
+
+    def __init__(self, size=1024, negative_ttl=60.0):
+        """
+        :param size: The maximum number of cached identities. If 0, nothing
+            is cached.
+        :param negative_ttl: The time, in seconds, during which an identity
+            is remembered as unknown. If `None`, unknown identities are not
+            cached.
+        """
+        self.size = size
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, identity):
+        """
+        Get a device from the cache.
+
+        :param identity: The identity of the device.
+        :returns: A tuple (found, device). `device` is `None` if the identity
+            is either not cached, or cached as unknown.
+        """
+        entry = self._entries.get(identity)
+
+        if entry is not None:
+            device, expiry = entry
+
+            if expiry is None or expiry > time.monotonic():
+                self._entries.move_to_end(identity)
+                self.hits += 1
+
+                return True, device
+
+        self.misses += 1
+
+        return False, None
+
+    def put(self, identity, device):
+        """
+        Add a device to the cache.
+
+        :param identity: The identity of the device.
+        :param device: The `DatabaseDevice`, or `None` if the identity is
+            unknown.
+        """
+        if not self.size:
+            return
+
+        if device is not None:
+            expiry = None
+        elif self.negative_ttl is not None:
+            expiry = time.monotonic() + self.negative_ttl
+        else:
+            return
+
+        self._entries[identity] = (device, expiry)
+        self._entries.move_to_end(identity)
+
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, identity):
+        """
+        Remove a device from the cache.
+
+        :param identity: The identity of the device.
+        """
+        self._entries.pop(identity, None)
+
+    def clear(self):
+        """
+        Remove all the devices from the cache.
+        """
+        self._entries.clear()
+
+
+def _create_devices_table(db, name='devices'):
+    db.execute(
+        'CREATE TABLE %s (%s)' % (
+            name,
+            ', '.join(' '.join(f) for f in Database.DATABASE_FIELDS),
+        ),
+    )
+
+
+def _create_devices_indexes(db):
+    db.execute('CREATE UNIQUE INDEX devices_alias ON devices (alias)')
+
+
+def _migrate_to_integer_identity(db):
+    """
+    Store identities as 24-bit integers instead of dotted strings, and index
+    aliases.
+    """
+    if not db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND "
+        "name = 'devices'",
+    ).fetchone():
+        _create_devices_table(db)
+        _create_devices_indexes(db)
+        return
+
+    _create_devices_table(db, name='devices_new')
+    rows = []
+    aliases = set()
+
+    # Aliases are now unique: the most recently written device keeps it.
+    for row in db.execute('SELECT * FROM devices ORDER BY rowid DESC'):
+        identity = Identity.from_string(row[0])
+        alias = row[1]
+
+        if alias is not None:
+            if alias in aliases:
+                logger.warning(
+                    "Alias %r is used by several devices. Removing it from "
+                    "%s.",
+                    alias,
+                    identity,
+                )
+                alias = None
+            else:
+                aliases.add(alias)
+
+        rows.append((identity_to_key(identity), alias) + tuple(row[2:]))
+
+    db.executemany(
+        'INSERT INTO devices_new VALUES (%s)' % ', '.join(
+            '?' * len(Database.DATABASE_FIELDS),
+        ),
+        rows,
+    )
+    db.execute('DROP TABLE devices')
+    db.execute('ALTER TABLE devices_new RENAME TO devices')
+    _create_devices_indexes(db)
+
+
+def _create_events_table(db):
+    """
+    Store the history of Insteon messages.
+    """
+    db.execute(
+        'CREATE TABLE events (%s)' % ', '.join(
+            ' '.join(f) for f in Database.EVENTS_FIELDS
+        ),
+    )
+    db.execute('CREATE INDEX events_timestamp ON events (timestamp)')
+
+
 class Database(object):
+    EVENTS_FIELDS = (
+        ('timestamp', 'REAL'),
+        ('sender', 'INTEGER'),
+        ('target', 'INTEGER'),
+        ('command1', 'INTEGER'),
+        ('command2', 'INTEGER'),
+        ('flags', 'INTEGER'),
+        ('hops_left', 'INTEGER'),
+        ('user_data', 'BLOB'),
+    )
     DATABASE_FIELDS = (
-        ('identity', 'TEXT'),
+        ('identity', 'INTEGER PRIMARY KEY'),
         ('alias', 'TEXT'),
         ('description', 'TEXT'),
         ('category', 'INTEGER'),
         ('subcategory', 'INTEGER'),
         ('firmware_version', 'INTEGER'),
     )
-    DATABASE_UNIQUE_FIELDS = ('identity',)
+
+    # The schema migrations, in order. The schema version stored in the
+    # database is the number of migrations applied to it.
+    MIGRATIONS = (
+        _migrate_to_integer_identity,
+        _create_events_table,
+    )
 
     @classmethod
-    def load_from_file(cls, path):
+    def load_from_file(cls, path, **kwargs):
         db = sqlite3.connect(path)
-        db.execute(
-            'CREATE TABLE IF NOT EXISTS devices (%s)' % ', '.join(
-                chain(
-                    (' '.join(f) for f in cls.DATABASE_FIELDS),
-                    (
-                        'UNIQUE(%s)' % ', '.join(cls.DATABASE_UNIQUE_FIELDS),
-                    ),
-                ),
-            )
-        )
-        return cls(db)
+        cls.migrate(db)
+
+        return cls(db, **kwargs)
+
+    @classmethod
+    def migrate(cls, db):
+        """
+        Upgrade the schema of a database to the latest version.
+
+        :param db: The SQLite connection.
+        """
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+
+        # The sqlite3 module does not open transactions for schema changes:
+        # manage them explicitly, so that a failed migration leaves nothing
+        # behind.
+        isolation_level = db.isolation_level
+        db.isolation_level = None
 
-    def __init__(self, db=None):
+        try:
+            for index, migration in enumerate(
+                cls.MIGRATIONS[version:],
+                start=version + 1,
+            ):
+                logger.debug(
+                    "Upgrading database schema to version %s...",
+                    index,
+                )
+
+                db.execute('BEGIN')
+
+                try:
+                    migration(db)
+                    db.execute('PRAGMA user_version = %d' % index)
+                except BaseException:
+                    db.execute('ROLLBACK')
+                    raise
+
+                db.execute('COMMIT')
+        finally:
+            db.isolation_level = isolation_level
+
+    def __init__(self, db=None, cache_size=1024, negative_cache_ttl=60.0):
+        """
+        Devices returned by `get_device` are cached in memory. Cached devices
+        are invalidated by `set_device` but changes made through other
+        connections are only seen once they are evicted, or after
+        `clear_cache` is called.
+
+        :param db: The SQLite connection.
+        :param cache_size: The maximum number of devices that `get_device`
+            keeps in memory. If 0, devices are never cached.
+        :param negative_cache_ttl: The time, in seconds, during which
+            `get_device` remembers that an identity is unknown. If `None`,
+            unknown identities are always looked up.
+        """
         self._db = db
+        self._transaction_depth = 0
+        self.cache = DeviceCache(
+            size=cache_size,
+            negative_ttl=negative_cache_ttl,
+        )
+
+    @property
+    def cache_hits(self):
+        return self.cache.hits
+
+    @property
+    def cache_misses(self):
+        return self.cache.misses
 
     def close(self):
         self._db.close()
         self._db = None
+        self.clear_cache()
+
+    def clear_cache(self):
+        """
+        Forget all the cached devices.
+        """
+        self.cache.clear()
+
+    @contextmanager
+    def transaction(self):
+        """
+        A context manager that groups all the writes it encloses in a single
+        transaction, committed on exit or rolled back on error.
+
+        Transactions can be nested: only the outermost one commits.
+        """
+        self._transaction_depth += 1
+
+        try:
+            yield self
+        except Exception:
+            self._transaction_depth -= 1
+
+            if not self._transaction_depth:
+                self._db.rollback()
+                self.clear_cache()
+
+            raise
+        else:
+            self._transaction_depth -= 1
+
+            if not self._transaction_depth:
+                self._db.commit()
 
     def get_device(self, identity):
-        return next(map(DatabaseDevice.from_row, self._db.execute(
-            'SELECT * FROM devices WHERE (identity = ?)',
-            [
-                str(identity),
-            ],
-        )), None)
+        found, device = self.cache.get(identity)
+
+        if not found:
+            device = next(map(DatabaseDevice.from_row, self._db.execute(
+                'SELECT * FROM devices WHERE (identity = ?)',
+                [
+                    identity_to_key(identity),
+                ],
+            )), None)
+            self.cache.put(identity, device)
+
+        return device
 
     def get_devices(self):
         return {
@@ -117,13 +463,284 @@ class Database(object):
         )), None)
 
     def set_device(self, *args, **kwargs):
-        device = DatabaseDevice(*args, **kwargs)
-        self._db.execute(
-            'INSERT OR REPLACE INTO devices VALUES (%s)' % ', '.join(
-                '?' * len(self.DATABASE_FIELDS),
+        return self.set_devices([DatabaseDevice(*args, **kwargs)])[0]
+
+    def set_devices(self, devices):
+        """
+        Add or replace several devices at once, in a single transaction.
+
+        :param devices: An iterable of `DatabaseDevice`.
+        :returns: The list of devices.
+        :raises sqlite3.IntegrityError: If an alias is already used by
+            another device.
+        """
+        devices = list(devices)
+        rows = [device.to_row() for device in devices]
+
+        with self.transaction():
+            # Unlike `INSERT OR REPLACE`, this fails instead of silently
+            # deleting another device that uses the same alias.
+            self._db.executemany(
+                'DELETE FROM devices WHERE (identity = ?)',
+                [row[:1] for row in rows],
+            )
+            self._db.executemany(
+                'INSERT INTO devices VALUES (%s)' % ', '.join(
+                    '?' * len(self.DATABASE_FIELDS),
+                ),
+                rows,
+            )
+
+            for device in devices:
+                self.cache.invalidate(device.identity)
+
+        return devices
+
+    def add_events(self, events):
+        """
+        Add events to the history, in a single transaction.
+
+        :param events: An iterable of `DatabaseEvent`.
+        """
+        with self.transaction():
+            self._db.executemany(
+                'INSERT INTO events VALUES (%s)' % ', '.join(
+                    '?' * len(self.EVENTS_FIELDS),
+                ),
+                [event.to_row() for event in events],
+            )
+
+    def get_events(self, since=None, until=None, sender=None):
+        """
+        Get events from the history, in chronological order.
+
+        :param since: An optional timestamp of the oldest event to get.
+        :param until: An optional timestamp after which events are excluded.
+        :param sender: An optional identity to filter events.
+        :returns: A list of `DatabaseEvent`.
+        """
+        conditions = []
+        parameters = []
+
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            parameters.append(since)
+
+        if until is not None:
+            conditions.append('timestamp < ?')
+            parameters.append(until)
+
+        if sender is not None:
+            conditions.append('sender = ?')
+            parameters.append(identity_to_key(sender))
+
+        return list(map(DatabaseEvent.from_row, self._db.execute(
+            'SELECT * FROM events%s ORDER BY timestamp' % (
+                ' WHERE %s' % ' AND '.join(conditions) if conditions else ''
             ),
-            device.to_row(),
+            parameters,
+        )))
+
+    def prune_events(self, before):
+        """
+        Remove old events from the history.
+
+        :param before: The timestamp before which events are removed.
+        :returns: The number of removed events.
+        """
+        with self.transaction():
+            return self._db.execute(
+                'DELETE FROM events WHERE timestamp < ?',
+                [before],
+            ).rowcount
+
+
+class AsyncDatabase(object):
+    """
+    An asyncio interface to a database file, that never blocks the event
+    loop.
+
+    Writes are performed, in order, by a single writer thread while reads are
+    spread over a pool of reader threads, each with its own connection. The
+    database uses write-ahead logging so that readers never wait for the
+    writer.
+
+    Devices returned by `get_device` are cached on the event loop thread, so
+    that a warm lookup does not leave the event loop at all.
+    """
+
+    def __init__(
+        self,
+        path,
+        loop=None,
+        readers=2,
+        cache_size=1024,
+        negative_cache_ttl=60.0,
+    ):
+        """
+        :param path: The path to the database file. If it is `':memory:'`,
+            all the queries are performed by the writer thread.
+        :param loop: The event loop to use.
+        :param readers: The number of reader threads.
+        :param cache_size: See `Database`.
+        :param negative_cache_ttl: See `Database`.
+        """
+        self.path = path
+        self.loop = loop or asyncio.get_event_loop()
+        self.cache = DeviceCache(
+            size=cache_size,
+            negative_ttl=negative_cache_ttl,
         )
-        self._db.commit()
+
+        db = sqlite3.connect(path, check_same_thread=False)
+        Database.migrate(db)
+
+        if path != ':memory:':
+            db.execute('PRAGMA journal_mode = WAL')
+            self._readers_executor = ThreadPoolExecutor(max_workers=readers)
+        else:
+            self._readers_executor = None
+
+        self._writer = self._create_database(db)
+        self._writer_executor = ThreadPoolExecutor(max_workers=1)
+        self._readers = []
+        self._readers_lock = Lock()
+        self._local = local()
+        self._generation = 0
+
+    def close(self):
+        """
+        Wait for the pending queries and close the database.
+        """
+        if self._readers_executor:
+            self._readers_executor.shutdown()
+
+        self._writer_executor.shutdown()
+
+        for database in self._readers + [self._writer]:
+            database.close()
+
+        self._readers = []
+        self.cache.clear()
+
+    async def get_device(self, identity):
+        found, device = self.cache.get(identity)
+
+        if not found:
+            generation = self._generation
+            device = await self._read('get_device', identity)
+
+            # Don't cache a device that was written while we were reading it.
+            if generation == self._generation:
+                self.cache.put(identity, device)
 
         return device
+
+    async def get_devices(self):
+        return await self._read('get_devices')
+
+    async def get_device_by_alias(self, alias):
+        return await self._read('get_device_by_alias', alias)
+
+    async def set_device(self, *args, **kwargs):
+        return (await self.set_devices([DatabaseDevice(*args, **kwargs)]))[0]
+
+    async def set_devices(self, devices):
+        """
+        Add or replace several devices at once, in a single transaction.
+
+        :param devices: An iterable of `DatabaseDevice`.
+        :returns: The list of devices.
+        """
+        devices = list(devices)
+
+        try:
+            return await self._write(
+                lambda database: database.set_devices(devices),
+            )
+        finally:
+            for device in devices:
+                self.cache.invalidate(device.identity)
+
+    async def add_events(self, events):
+        events = list(events)
+
+        return await self._write(
+            lambda database: database.add_events(events),
+        )
+
+    async def get_events(self, since=None, until=None, sender=None):
+        return await self._read('get_events', since, until, sender)
+
+    async def prune_events(self, before):
+        return await self._write(
+            lambda database: database.prune_events(before),
+        )
+
+    async def write(self, func, *args):
+        """
+        Call a function on the writer thread, within a transaction.
+
+        Use this to perform several queries atomically. As the written
+        devices are unknown, the cache is cleared afterwards.
+
+        :param func: The function to call with the writer `Database` as its
+            first argument.
+        :param args: The additional arguments for `func`.
+        :returns: The result of `func`.
+        """
+        try:
+            return await self._write(func, *args)
+        finally:
+            self.cache.clear()
+
+    # Private methods below.
+
+    async def _write(self, func, *args):
+        self._generation += 1
+
+        def transaction():
+            with self._writer.transaction():
+                return func(self._writer, *args)
+
+        try:
+            return await self.loop.run_in_executor(
+                self._writer_executor,
+                transaction,
+            )
+        finally:
+            self._generation += 1
+
+    @staticmethod
+    def _create_database(db):
+        # The threads don't cache anything: the event loop thread does.
+        return Database(db, cache_size=0)
+
+    def _read(self, method, *args):
+        if self._readers_executor:
+            executor = self._readers_executor
+        else:
+            executor = self._writer_executor
+
+        return self.loop.run_in_executor(
+            executor,
+            self._call_reader,
+            method,
+            args,
+        )
+
+    def _call_reader(self, method, args):
+        if not self._readers_executor:
+            return getattr(self._writer, method)(*args)
+
+        database = getattr(self._local, 'database', None)
+
+        if database is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA query_only = ON')
+            database = self._local.database = self._create_database(db)
+
+            with self._readers_lock:
+                self._readers.append(database)
+
+        return getattr(database, method)(*args)
@@ -0,0 +1,148 @@
+"""
+Devices discovery.
+"""
+
+import asyncio
+
+from collections import namedtuple
+
+from .exceptions import (
+    CommandFailure,
+    CommandTimeout,
+    TransmissionFailure,
+)
+from .log import logger as main_logger
+
+logger = main_logger.getChild('discovery')
+
+
+class DiscoveryResult(namedtuple('_DiscoveryResult', (
+    'identity',
+    'device_info',
+    'latency',
+    'attempts',
+))):
+    """
+    The outcome of the discovery of a device.
+
+    `device_info` is `None` if the device never answered. `latency` is the
+    time, in seconds, between the first ID request and the answer (or the
+    last failed attempt).
+    """
+
+    @property
+    def success(self):
+        return self.device_info is not None
+
+
+class DeviceDiscovery(object):
+    """
+    Discovers devices by keeping several ID requests in flight at once.
+
+    Answers are matched to their pending request by the PLM reply
+    correlation. Devices that don't answer in time, or whose ID request
+    fails, are retried with an exponential backoff.
+    """
+
+    def __init__(
+        self,
+        plm,
+        concurrency=8,
+        timeout=2.0,
+        retries=2,
+        backoff=0.5,
+        loop=None,
+    ):
+        """
+        :param plm: The `PowerLineModem` instance.
+        :param concurrency: The maximum number of ID requests in flight.
+        :param timeout: The time to wait for each answer, in seconds.
+        :param retries: The number of additional ID requests to send to a
+            device that does not answer.
+        :param backoff: The delay before the first retry, in seconds. It
+            doubles after each retry.
+        :param loop: The event loop to use.
+        """
+        self.plm = plm
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.loop = loop or plm.loop
+
+    async def discover(self, identities, on_result=None):
+        """
+        Discover the specified devices.
+
+        :param identities: The identities of the devices to discover.
+        :param on_result: An optional callable to call with each
+            `DiscoveryResult` as soon as it is known.
+        :returns: The list of `DiscoveryResult`, in completion order.
+        """
+        results = []
+        semaphore = asyncio.Semaphore(self.concurrency, loop=self.loop)
+
+        async def discover_one(identity):
+            result = await self._discover_one(identity, semaphore)
+            results.append(result)
+
+            if on_result:
+                on_result(result)
+
+        await asyncio.gather(
+            *[discover_one(identity) for identity in identities],
+            loop=self.loop
+        )
+
+        return results
+
+    # Private methods below.
+
+    async def _discover_one(self, identity, semaphore):
+        start = None
+        delay = self.backoff
+
+        for attempt in range(1, self.retries + 2):
+            if attempt > 1:
+                logger.debug(
+                    "Retrying %s in %s second(s)...",
+                    identity,
+                    delay,
+                )
+                await asyncio.sleep(delay, loop=self.loop)
+                delay *= 2
+
+            try:
+                async with semaphore:
+                    # Time spent waiting for a slot is not latency.
+                    if start is None:
+                        start = self.loop.time()
+
+                    device_info = await self.plm.id_request(
+                        identity,
+                        timeout=self.timeout,
+                    )
+            except CommandTimeout:
+                logger.debug("%s did not answer.", identity)
+                continue
+            except (CommandFailure, TransmissionFailure) as ex:
+                logger.debug(
+                    "Could not send an ID request to %s: %s",
+                    identity,
+                    ex,
+                )
+                continue
+
+            return DiscoveryResult(
+                identity=identity,
+                device_info=device_info,
+                latency=self.loop.time() - start,
+                attempts=attempt,
+            )
+
+        return DiscoveryResult(
+            identity=identity,
+            device_info=None,
+            latency=self.loop.time() - start,
+            attempts=self.retries + 1,
+        )
@@ -0,0 +1,389 @@
+"""
+Incoming messages dispatching.
+"""
+
+import asyncio
+
+from collections import OrderedDict
+from enum import Enum
+
+from .messaging import (
+    INSTEON_COMMAND_CODES,
+    MessageFailure,
+)
+from .objects import MESSAGE_TYPE_MASK
+
+
+class OverflowPolicy(Enum):
+    """
+    What a `SubscriberQueue` does with a message it has no room for.
+    """
+    #: Accept the message and ask the producer to pause until the queue is
+    #: drained to half its maximum size.
+    block = 'block'
+    #: Discard the oldest queued message to make room.
+    drop_oldest = 'drop_oldest'
+    #: Discard the incoming message.
+    drop_newest = 'drop_newest'
+
+
+class SubscriberQueue(asyncio.Queue):
+    """
+    A queue of dispatched messages with an overflow policy.
+
+    Messages are always put with `put_nowait`, from the dispatcher: when the
+    queue is full, `overflow` decides what happens. With
+    `OverflowPolicy.block`, the message is accepted anyway and `on_pause` is
+    called, so that the producer stops reading new messages. The queue can
+    therefore exceed `maxsize` by the messages the producer had already read.
+
+    `high_water_mark` is the largest size the queue ever reached and
+    `dropped` the number of messages discarded because of an overflow.
+    """
+
+    def __init__(
+        self,
+        maxsize=0,
+        overflow=OverflowPolicy.block,
+        on_pause=None,
+        on_resume=None,
+        **kwargs
+    ):
+        """
+        :param maxsize: The maximum size of the queue. If 0, the queue is
+            unbounded.
+        :param overflow: The `OverflowPolicy` to apply when the queue is full.
+        :param on_pause: A callable to call when the producer must pause.
+        :param on_resume: A callable to call when the producer can resume.
+        :param kwargs: Additional arguments for `asyncio.Queue`.
+        """
+        super().__init__(maxsize=maxsize, **kwargs)
+        self.overflow = overflow
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+        self.high_water_mark = 0
+        self.dropped = 0
+        self.paused = False
+
+    def put_nowait(self, item):
+        if self.full():
+            if self.overflow is OverflowPolicy.drop_newest:
+                self.dropped += 1
+                return
+
+            if self.overflow is OverflowPolicy.drop_oldest:
+                self.get_nowait()
+                self.task_done()
+                self.dropped += 1
+                super().put_nowait(item)
+            else:
+                self._pause()
+
+                # Same as `asyncio.Queue.put_nowait`, without the size check.
+                self._put(item)
+                self._unfinished_tasks += 1
+                self._finished.clear()
+                self._wakeup_next(self._getters)
+        else:
+            super().put_nowait(item)
+
+        self.high_water_mark = max(self.high_water_mark, self.qsize())
+
+    def get_nowait(self):
+        item = super().get_nowait()
+
+        if self.paused and self.qsize() <= self.maxsize // 2:
+            self._resume()
+
+        return item
+
+    def close(self):
+        """
+        Close the queue, letting the producer resume if it was paused because
+        of it.
+        """
+        if self.paused:
+            self._resume()
+
+    # Private methods below.
+
+    def _pause(self):
+        if not self.paused:
+            self.paused = True
+
+            if self.on_pause:
+                self.on_pause()
+
+    def _resume(self):
+        self.paused = False
+
+        if self.on_resume:
+            self.on_resume()
+
+
+class Subscription(object):
+    """
+    Represents a subscription to a `MessageDispatcher`.
+    """
+
+    def __init__(self, keys, callback):
+        self.keys = keys
+        self.callback = callback
+
+
+class MessageDispatcher(object):
+    """
+    Dispatches incoming messages to the subscribers interested in them.
+
+    Subscribers are indexed by command code and, for Insteon messages,
+    optionally by sender identity, so that dispatching a message only costs a
+    few dictionary lookups regardless of the number of subscribers.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._sender_subscriptions_count = 0
+
+    def subscribe(
+        self,
+        callback,
+        command_codes=None,
+        senders=None,
+        handle_failures=False,
+    ):
+        """
+        Subscribe to incoming messages.
+
+        :param callback: The callable to call with each matching message.
+        :param command_codes: An optional list of command codes to filter
+            messages. If `None`, all messages are matched.
+        :param senders: An optional list of identities to filter Insteon
+            messages. If specified and `command_codes` is `None`, only standard
+            and extended Insteon messages are matched.
+        :param handle_failures: A flag that if set, causes `MessageFailure`
+            instances to be matched too.
+        :returns: A `Subscription` instance to pass to `unsubscribe`.
+        """
+        if senders is not None:
+            keys = [
+                (command_code, bytes(sender))
+                for command_code in command_codes or INSTEON_COMMAND_CODES
+                for sender in senders
+            ]
+            self._sender_subscriptions_count += 1
+        elif command_codes is not None:
+            keys = list(command_codes)
+        else:
+            keys = [None]
+
+        if handle_failures and keys != [None]:
+            keys.append(MessageFailure)
+
+        for key in keys:
+            self._subscribers[key] = self._subscribers.get(key, ()) + (
+                callback,
+            )
+
+        return Subscription(keys=keys, callback=callback)
+
+    def unsubscribe(self, subscription):
+        """
+        Unsubscribe from incoming messages.
+
+        :param subscription: The `Subscription` instance returned by
+            `subscribe`.
+        """
+        for key in subscription.keys:
+            callbacks = list(self._subscribers[key])
+            callbacks.remove(subscription.callback)
+
+            if callbacks:
+                self._subscribers[key] = tuple(callbacks)
+            else:
+                del self._subscribers[key]
+
+        if any(isinstance(key, tuple) for key in subscription.keys):
+            self._sender_subscriptions_count -= 1
+
+    def dispatch(self, message):
+        """
+        Dispatch a message to its subscribers.
+
+        :param message: The message to dispatch.
+        """
+        subscribers = self._subscribers
+
+        if isinstance(message, MessageFailure):
+            key = MessageFailure
+        else:
+            key = message.command_code
+
+            if self._sender_subscriptions_count and \
+                    key in INSTEON_COMMAND_CODES:
+                for callback in subscribers.get(
+                    (key, bytes(message.body[0:3])),
+                    (),
+                ):
+                    callback(message)
+
+        for callback in subscribers.get(key, ()):
+            callback(message)
+
+        for callback in subscribers.get(None, ()):
+            callback(message)
+
+
+class Expectation(object):
+    """
+    Represents a reply expected by a `ReplyCorrelator`.
+    """
+
+    def __init__(self, key, future, flags_mask, flags_value):
+        self.key = key
+        self.future = future
+        self.flags_mask = flags_mask
+        self.flags_value = flags_value
+
+    def matches(self, insteon_message):
+        return insteon_message.flags_byte & self.flags_mask == \
+            self.flags_value
+
+
+class ReplyCorrelator(object):
+    """
+    Correlates incoming Insteon messages with the requests awaiting them.
+
+    Expectations are indexed by sender identity and command byte, so that
+    resolving a reply only costs a couple of dictionary lookups regardless of
+    the number of outstanding requests.
+    """
+
+    def __init__(self):
+        self._expectations = {}
+
+    def expect(self, future, sender, command=None, flags=(), not_flags=()):
+        """
+        Register an expected reply.
+
+        :param future: The future to resolve with the matching
+            `InsteonMessage`.
+        :param sender: The identity of the device expected to reply.
+        :param command: The expected first command byte. If `None`, any
+            command matches.
+        :param flags: The `InsteonMessageFlag` that must be set.
+        :param not_flags: The `InsteonMessageFlag` that must not be set.
+        :returns: An `Expectation` instance to pass to `discard`.
+        """
+        flags_value = sum(1 << flag.value for flag in flags)
+        flags_mask = flags_value | sum(1 << flag.value for flag in not_flags)
+        expectation = Expectation(
+            key=(bytes(sender), command),
+            future=future,
+            flags_mask=flags_mask,
+            flags_value=flags_value,
+        )
+        self._expectations.setdefault(expectation.key, []).append(expectation)
+
+        return expectation
+
+    def discard(self, expectation):
+        """
+        Discard an expected reply.
+
+        :param expectation: The `Expectation` returned by `expect`. It is fine
+            to discard an expectation that was resolved already.
+        """
+        expectations = self._expectations.get(expectation.key)
+
+        if expectations and expectation in expectations:
+            expectations.remove(expectation)
+
+            if not expectations:
+                del self._expectations[expectation.key]
+
+    def resolve(self, insteon_message):
+        """
+        Resolve the oldest expectation matching an Insteon message.
+
+        :param insteon_message: The received `InsteonMessage`.
+        :returns: `True` if an expectation was resolved.
+        """
+        if not self._expectations:
+            return False
+
+        for key in (
+            (insteon_message.sender, insteon_message.command_bytes[0]),
+            (insteon_message.sender, None),
+        ):
+            for expectation in self._expectations.get(key, ()):
+                if expectation.matches(insteon_message) and \
+                        not expectation.future.done():
+                    expectation.future.set_result(insteon_message)
+                    self.discard(expectation)
+
+                    return True
+
+        return False
+
+
+class DuplicateFilter(object):
+    """
+    Detects repeated Insteon messages.
+
+    A message is a duplicate if it repeats the last message with the same
+    sender, target and message type, received less than `window` seconds
+    earlier. Messages are compared by command bytes and user data: the
+    remaining hops are ignored, as they differ between the repetitions of a
+    message.
+
+    Only consecutive repeats are suppressed, so that a device toggled back
+    and forth within the window still reports every change.
+
+    Messages are remembered in reception order, so that forgetting those
+    older than `window` only ever looks at the oldest ones.
+    """
+
+    def __init__(self, window=0.5):
+        """
+        :param window: The duplicate suppression window, in seconds.
+        """
+        self.window = window
+        self.suppressed = 0
+        self._last_messages = OrderedDict()
+
+    def is_duplicate(self, insteon_message, now):
+        """
+        Check whether an Insteon message is a duplicate and remember it.
+
+        :param insteon_message: The `InsteonMessage` to check.
+        :param now: The current time, in seconds.
+        :returns: `True` if the message is a duplicate.
+        """
+        self._expire(now)
+
+        sender, target, flags_byte, command_bytes, user_data = insteon_message
+        key = (sender, target, flags_byte & MESSAGE_TYPE_MASK)
+        payload = (command_bytes, user_data)
+        last_message = self._last_messages.get(key)
+
+        # The window starts with the original message: repeats do not extend
+        # it.
+        if last_message is not None and last_message[0] == payload:
+            self.suppressed += 1
+            return True
+
+        self._last_messages[key] = (payload, now)
+        self._last_messages.move_to_end(key)
+
+        return False
+
+    # Private methods below.
+
+    def _expire(self, now):
+        while self._last_messages:
+            key, (_, timestamp) = next(iter(self._last_messages.items()))
+
+            if now - timestamp < self.window:
+                break
+
+            del self._last_messages[key]
@@ -8,6 +8,8 @@ import click
 import logging
 import os
 import signal
+import sqlite3
+import time
 
 from binascii import hexlify
 from chromalog.mark.helpers.simple import (
@@ -17,8 +19,18 @@ from chromalog.mark.helpers.simple import (
 )
 from itertools import chain
 
+from .archive import (
+    ArchiveReader,
+    ArchiveWriter,
+)
 from .automation import Automate
-from .database import Database
+from .database import (
+    AsyncDatabase,
+    Database,
+    DatabaseDevice,
+)
+from .discovery import DeviceDiscovery
+from .history import EventRecorder
 from .plm import PowerLineModem
 from .objects import (
     AllLinkMode,
@@ -42,6 +54,22 @@ def _setup_logging(debug):
         )
 
 
+def _get_async_database(ctx):
+    """
+    Get an `AsyncDatabase` on the database file, for use from coroutines.
+
+    The database is opened on first use and closed with the context.
+    """
+    if 'async_database' not in ctx.obj:
+        async_database = ctx.obj['async_database'] = AsyncDatabase(
+            ctx.obj['database_path'],
+            loop=ctx.obj['loop'],
+        )
+        ctx.call_on_close(async_database.close)
+
+    return ctx.obj['async_database']
+
+
 class AllLinkModeType(click.ParamType):
     name = "All-link mode"
     def convert(self, value, param, ctx):
@@ -159,6 +187,8 @@ def pysteon(ctx, debug, root):
         database = Database()
 
     ctx.obj['database'] = database
+    ctx.obj['database_path'] = database_path
+    ctx.obj['archive_path'] = os.path.join(root, 'archive')
 
     @ctx.call_on_close
     def close():
@@ -183,17 +213,33 @@ def pysteon(ctx, debug, root):
     default=os.environ.get('PYSTEON_SERIAL_PORT_URL', '/dev/ttyUSB0'),
     help="The serial port URL through which the PLM is exposed.",
 )
+@click.option(
+    '--use-thread',
+    is_flag=True,
+    default=None,
+    help="Read the serial port from a dedicated thread rather than from the "
+    "event loop. This is the default for serial ports that can't be polled.",
+)
+@click.option(
+    '--command-timeout',
+    default=10.0,
+    type=float,
+    help="The time to wait for a command sent to the PLM to complete, in "
+    "seconds.",
+)
 @click.pass_context
-def plm(ctx, serial_port_url):
+def plm(ctx, serial_port_url, use_thread, command_timeout):
     logger.debug(
         "Connecting with PowerLine Modem on serial port: %s. Please wait...",
         important(serial_port_url),
     )
 
     loop = ctx.obj['loop'] = asyncio.get_event_loop()
+    ctx.obj['command_timeout'] = command_timeout
     plm = ctx.obj['plm'] = PowerLineModem(
         serial_port_url=serial_port_url,
         loop=loop,
+        use_thread=use_thread,
     )
 
     @ctx.call_on_close
@@ -241,7 +287,9 @@ def info(ctx, fetch):
         logger.info("Firmware version: %s", important(plm.firmware_version))
 
         controllers, responders = loop.run_until_complete(
-            plm.get_all_link_records(),
+            plm.get_all_link_records(
+                step_timeout=ctx.obj['command_timeout'],
+            ),
         )
 
         devices = database.get_devices()
@@ -257,52 +305,54 @@ def info(ctx, fetch):
                     "Fetching missing device information for %d device(s)...",
                     len(missing_device_identities),
                 )
+                discovery = DeviceDiscovery(plm=plm, loop=loop)
+                completed = []
 
-                for index, identity in enumerate(
-                    missing_device_identities,
-                    start=1,
-                ):
+                def on_result(result):
+                    completed.append(result)
                     logger.info(
-                        "[%d/%d] %s...",
-                        index,
+                        "[%d/%d] %s: %s",
+                        len(completed),
                         len(missing_device_identities),
-                        identity,
+                        result.identity,
+                        success("success") if result.success else
+                        error("timed out"),
                     )
 
-                    try:
-                        device_info = loop.run_until_complete(
-                            asyncio.wait_for(
-                                plm.id_request(identity),
-                                2,
-                            ),
-                        )
-                    except asyncio.TimeoutError:
-                        logger.info(
-                            "[%d/%d] %s: %s",
-                            index,
-                            len(missing_device_identities),
-                            identity,
-                            error("timed out"),
-                        )
-                    else:
-                        devices[identity] = database.set_device(
-                            identity=device_info['identity'],
-                            alias=None,
-                            description=None,
-                            category=device_info['category'],
-                            subcategory=device_info['subcategory'],
-                            firmware_version=device_info['firmware_version'],
-                        )
-                        logger.info(
-                            "[%d/%d] %s: %s",
-                            index,
-                            len(missing_device_identities),
-                            identity,
-                            success("success"),
-                        )
+                results = loop.run_until_complete(
+                    discovery.discover(
+                        missing_device_identities,
+                        on_result=on_result,
+                    ),
+                )
+
+                for device in database.set_devices(
+                    DatabaseDevice(
+                        identity=result.device_info['identity'],
+                        alias=None,
+                        description=None,
+                        category=result.device_info['category'],
+                        subcategory=result.device_info['subcategory'],
+                        firmware_version=result.device_info[
+                            'firmware_version'
+                        ],
+                    )
+                    for result in results
+                    if result.success
+                ):
+                    devices[device.identity] = device
 
                 logger.info("Done fetching missing device information.")
 
+                for result in sorted(results, key=lambda r: r.latency):
+                    logger.info(
+                        "%s: %s in %.3f second(s) (%d attempt(s)).",
+                        result.identity,
+                        "answered" if result.success else "no answer",
+                        result.latency,
+                        result.attempts,
+                    )
+
         if controllers:
             logger.info("Controllers:")
 
@@ -339,12 +389,37 @@ def info(ctx, fetch):
     default=None,
     help="A python module path to load for automation.",
 )
+@click.option(
+    '-w',
+    '--workers',
+    default=4,
+    type=click.IntRange(min=1),
+    help="The number of events that can be handled concurrently. Events from "
+    "a given device are always handled in order.",
+)
+@click.option(
+    '--record/--no-record',
+    default=False,
+    help="Record all the Insteon messages in the events history.",
+)
+@click.option(
+    '--retention',
+    default=30,
+    type=click.IntRange(min=1),
+    help="The number of days the recorded Insteon messages are kept.",
+)
+@click.option(
+    '--archive/--no-archive',
+    default=False,
+    help="Append all the Insteon messages to the events archive, for use "
+    "with the stats command.",
+)
 @click.pass_context
-def monitor(ctx, automate_module):
+def monitor(ctx, automate_module, workers, record, retention, archive):
     debug = ctx.obj['debug']
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
-    database = ctx.obj['database']
+    database = _get_async_database(ctx)
 
     try:
         logger.info(
@@ -352,7 +427,9 @@ def monitor(ctx, automate_module):
             important(plm),
         )
 
+        # Stopping on SIGTERM too lets the buffered events be written.
         loop.add_signal_handler(signal.SIGINT, plm.interrupt)
+        loop.add_signal_handler(signal.SIGTERM, plm.interrupt)
         automate = Automate(plm=plm, database=database, loop=loop)
 
         automate.load_module('pysteon.automation.default')
@@ -362,12 +439,42 @@ def monitor(ctx, automate_module):
 
         async def run():
             async with automate:
-                await plm.monitor(on_event_callback=automate.handle_message)
+                if not record and not archive:
+                    await plm.monitor(
+                        on_event_callback=automate.handle_message,
+                        workers=workers,
+                    )
+                    return
+
+                async with EventRecorder(
+                    database=database if record else None,
+                    loop=loop,
+                    retention=retention * 24 * 3600,
+                    archive=ArchiveWriter(
+                        ctx.obj['archive_path'],
+                    ) if archive else None,
+                ) as recorder:
+                    plm.on_insteon_message.connect(recorder.record)
+
+                    try:
+                        await plm.monitor(
+                            on_event_callback=automate.handle_message,
+                            workers=workers,
+                        )
+                    finally:
+                        plm.on_insteon_message.disconnect(recorder.record)
+
+                logger.info(
+                    "Recorded %s event(s) (%s dropped).",
+                    recorder.recorded,
+                    recorder.dropped,
+                )
 
         try:
             loop.run_until_complete(run())
         finally:
             loop.remove_signal_handler(signal.SIGINT)
+            loop.remove_signal_handler(signal.SIGTERM)
             logger.info(
                 "No longer monitoring %s.",
                 important(plm),
@@ -420,7 +527,7 @@ def link(ctx, group, mode, timeout, alias, description):
     debug = ctx.obj['debug']
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
-    database = ctx.obj['database']
+    database = _get_async_database(ctx)
 
     try:
         logger.info(
@@ -467,30 +574,40 @@ def link(ctx, group, mode, timeout, alias, description):
                         important(mode),
                     )
 
-                identity = all_link_info['identity']
-                device = database.get_device(identity)
+                await database.write(
+                    update_device,
+                    all_link_info,
+                    alias,
+                    description,
+                )
 
-                # Make sure to keep the existing information.
-                if device:
-                    logger.info(
-                        "Device %s is known already. Updating the entry.",
-                        device,
-                    )
+        def update_device(database, all_link_info, alias, description):
+            identity = all_link_info['identity']
+            device = database.get_device(identity)
+
+            # Make sure to keep the existing information.
+            if device:
+                logger.info(
+                    "Device %s is known already. Updating the entry.",
+                    device,
+                )
 
-                    if alias is None:
-                        alias = device.alias
+                if alias is None:
+                    alias = device.alias
 
-                    if description is None:
-                        description = device.description
+                if description is None:
+                    description = device.description
 
-                database.set_device(
+            database.set_devices([
+                DatabaseDevice(
                     identity=identity,
                     alias=alias,
                     description=description,
                     category=all_link_info['category'],
                     subcategory=all_link_info['subcategory'],
                     firmware_version=all_link_info['firmware_version'],
-                )
+                ),
+            ])
 
         loop.add_signal_handler(signal.SIGINT, plm.interrupt)
 
@@ -536,7 +653,14 @@ def light_on(ctx, device, level, instant):
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
 
-    level = loop.run_until_complete(plm.light_on(device.identity, level, instant))
+    level = loop.run_until_complete(
+        plm.light_on(
+            device.identity,
+            level,
+            instant,
+            timeout=ctx.obj['command_timeout'],
+        ),
+    )
     logger.info("%s light level set to: %s%%", device, level)
 
 
@@ -560,7 +684,13 @@ def light_off(ctx, device, instant):
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
 
-    level = loop.run_until_complete(plm.light_off(device.identity, instant))
+    level = loop.run_until_complete(
+        plm.light_off(
+            device.identity,
+            instant,
+            timeout=ctx.obj['command_timeout'],
+        ),
+    )
     logger.info("%s light level set to: %s%%", device, level)
 
 
@@ -585,7 +715,11 @@ def remote_enter_linking(ctx, device, group):
     plm = ctx.obj['plm']
 
     loop.run_until_complete(
-        plm.remote_enter_linking(device.identity, group=group),
+        plm.remote_enter_linking(
+            device.identity,
+            group=group,
+            timeout=ctx.obj['command_timeout'],
+        ),
     )
 
 
@@ -610,7 +744,11 @@ def remote_enter_unlinking(ctx, device, group):
     plm = ctx.obj['plm']
 
     loop.run_until_complete(
-        plm.remote_enter_unlinking(device.identity, group=group),
+        plm.remote_enter_unlinking(
+            device.identity,
+            group=group,
+            timeout=ctx.obj['command_timeout'],
+        ),
     )
 
 
@@ -628,7 +766,7 @@ def remote_set(ctx, device):
     plm = ctx.obj['plm']
 
     loop.run_until_complete(
-        plm.remote_set(device.identity),
+        plm.remote_set(device.identity, timeout=ctx.obj['command_timeout']),
     )
 
 
@@ -645,7 +783,9 @@ def remote_set(ctx, device):
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
 
-    loop.run_until_complete(plm.beep(device.identity))
+    loop.run_until_complete(
+        plm.beep(device.identity, timeout=ctx.obj['command_timeout']),
+    )
 
 
 @plm.command(
@@ -663,7 +803,12 @@ def get_device_info(ctx, device):
     loop = ctx.obj['loop']
     plm = ctx.obj['plm']
 
-    info = loop.run_until_complete(plm.get_device_info(device.identity))
+    info = loop.run_until_complete(
+        plm.get_device_info(
+            device.identity,
+            timeout=ctx.obj['command_timeout'],
+        ),
+    )
     logger.info("Device information for: %s", important(device))
     logger.info("Ramp rate: %s second(s)", info['ramp_rate'])
     logger.info("On level: %s", info['on_level'])
@@ -696,7 +841,12 @@ def set_device_info(ctx, device, device_info, value):
     plm = ctx.obj['plm']
 
     value = loop.run_until_complete(
-        plm.set_device_info(device.identity, device_info, value),
+        plm.set_device_info(
+            device.identity,
+            device_info,
+            value,
+            timeout=ctx.obj['command_timeout'],
+        ),
     )
     logger.info("%s set to: %s", device_info, value)
 
@@ -731,4 +881,87 @@ def update(ctx, device, alias, description):
     if description:
         device = device._replace(description=description)
 
-    database.set_device(*device)
+    try:
+        database.set_device(*device)
+    except sqlite3.IntegrityError:
+        owner = database.get_device_by_alias(device.alias)
+
+        raise click.ClickException(
+            "The alias %s is already used by %s." % (
+                device.alias,
+                owner.identity if owner else "another device",
+            ),
+        )
+
+
+@pysteon.command(help="Show statistics about the archived Insteon events.")
+@click.option(
+    '--days',
+    default=None,
+    type=click.IntRange(min=1),
+    help="Only consider the events of the last days.",
+)
+@click.pass_context
+def stats(ctx, days):
+    database = ctx.obj['database']
+
+    try:
+        from .stats import (
+            filter_columns,
+            get_device_counts,
+            get_hourly_histogram,
+            get_inter_event_gaps,
+        )
+    except ImportError:
+        raise click.ClickException(
+            "The stats command requires NumPy. Install pysteon[stats].",
+        )
+
+    columns = ArchiveReader(ctx.obj['archive_path']).read_columns()
+
+    if days:
+        columns = filter_columns(columns, since=time.time() - days * 86400)
+
+    def get_name(identity):
+        device = database.get_device(identity)
+
+        return device.name if device else identity
+
+    logger.info(
+        "%s archived event(s).",
+        important(len(columns['timestamp'])),
+    )
+
+    if not len(columns['timestamp']):
+        return
+
+    logger.info("Events by device:")
+
+    for identity, count in get_device_counts(columns):
+        logger.info("%s: %s", get_name(identity), important(count))
+
+    logger.info("Events by hour of the day:")
+
+    histogram = get_hourly_histogram(
+        columns,
+        utc_offset=time.localtime().tm_gmtoff,
+    )
+    scale = 50.0 / max(histogram)
+
+    for hour, count in enumerate(histogram):
+        logger.info("%02d:00 %8d %s", hour, count, '#' * int(count * scale))
+
+    logger.info("Time between events (count, mean, min, max in seconds):")
+
+    for identity, gaps in sorted(
+        get_inter_event_gaps(columns).items(),
+        key=lambda item: item[1].mean,
+    ):
+        logger.info(
+            "%s: %s, %.1f, %.1f, %.1f",
+            get_name(identity),
+            gaps.count,
+            gaps.mean,
+            gaps.minimum,
+            gaps.maximum,
+        )
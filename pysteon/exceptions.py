@@ -2,6 +2,9 @@
 Exception classes.
 """
 
+import asyncio
+
+
 class CommandFailure(RuntimeError):
     """
     An INSTEON command reported a failure.
@@ -10,3 +13,32 @@ class CommandFailure(RuntimeError):
     def __init__(self, command_code):
         self.command_code = command_code
         super().__init__("INSTEON command 0x%02x failed" % command_code.value)
+
+
+class TransmissionFailure(RuntimeError):
+    """
+    A command could not be sent to the PLM within its retry policy.
+    """
+
+    def __init__(self, command_code, attempts):
+        self.command_code = command_code
+        self.attempts = attempts
+        super().__init__(
+            "Command 0x%02x could not be sent after %d attempt(s)" % (
+                command_code.value,
+                attempts,
+            ),
+        )
+
+
+class CommandTimeout(asyncio.TimeoutError):
+    """
+    A PLM operation did not complete in time.
+    """
+
+    def __init__(self, operation, timeout):
+        self.operation = operation
+        self.timeout = timeout
+        super().__init__(
+            "%s did not complete within %s second(s)" % (operation, timeout),
+        )
@@ -0,0 +1,174 @@
+"""
+Insteon events history.
+"""
+
+import asyncio
+import time
+
+from collections import deque
+
+from .database import DatabaseEvent
+from .log import logger as main_logger
+
+logger = main_logger.getChild('history')
+
+
+class EventRecorder(object):
+    """
+    Records Insteon messages in the events history of an `AsyncDatabase`,
+    and optionally in an events archive.
+
+    Recording a message only appends it to an in-memory buffer: a background
+    task writes the buffer in a single transaction whenever it holds
+    `batch_size` events, or every `flush_interval` seconds. The same task
+    periodically removes the events older than `retention` seconds, and
+    writes the events buffered by the archive every `archive_interval`
+    seconds.
+
+    If the database cannot keep up, at most `max_pending` events are
+    buffered: the oldest ones are dropped and counted in `dropped`.
+
+    Use as an asynchronous context manager to run the background task.
+    """
+
+    def __init__(
+        self,
+        database,
+        loop=None,
+        batch_size=500,
+        flush_interval=5.0,
+        max_pending=10000,
+        retention=30 * 24 * 3600,
+        prune_interval=3600,
+        archive=None,
+        archive_interval=300,
+    ):
+        """
+        :param database: The `AsyncDatabase` instance. If `None`, events are
+            only recorded in `archive`.
+        :param loop: The event loop to use. Defaults to the database loop.
+        :param batch_size: The number of buffered events that triggers a
+            write.
+        :param flush_interval: The maximum time, in seconds, an event stays in
+            the buffer.
+        :param max_pending: The maximum number of buffered events.
+        :param retention: The time, in seconds, events are kept in the
+            history. If `None`, events are kept forever.
+        :param prune_interval: The time, in seconds, between two removals of
+            the expired events.
+        :param archive: An optional `ArchiveWriter` instance. Archived events
+            are never pruned.
+        :param archive_interval: The maximum time, in seconds, events stay
+            in the archive buffer.
+        """
+        self.database = database
+        self.archive = archive
+        self.loop = loop or database.loop
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.archive_interval = archive_interval
+        self.recorded = 0
+        self.dropped = 0
+        self._pending = deque(maxlen=max_pending)
+        self._wake_up = asyncio.Event(loop=self.loop)
+        self._stopping = False
+        self._task = None
+
+    async def __aenter__(self):
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._run(), loop=self.loop)
+
+        return self
+
+    async def __aexit__(self, *args):
+        # Cancelling the task could interrupt a write, and lose the events it
+        # took from the buffer: let it finish instead.
+        self._stopping = True
+        self._wake_up.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+        if self.archive:
+            await self.loop.run_in_executor(None, self.archive.flush)
+
+    def record(self, insteon_message):
+        """
+        Record an Insteon message.
+
+        :param insteon_message: The `InsteonMessage` to record.
+        """
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+
+        self._pending.append(
+            DatabaseEvent.from_insteon_message(time.time(), insteon_message),
+        )
+
+        if len(self._pending) >= self.batch_size:
+            self._wake_up.set()
+
+    async def flush(self):
+        """
+        Write all the buffered events.
+        """
+        events = list(self._pending)
+        self._pending.clear()
+
+        if events:
+            if self.database:
+                await self.database.add_events(events)
+
+            if self.archive:
+                await self.loop.run_in_executor(
+                    None,
+                    self.archive.append_events,
+                    events,
+                )
+
+            self.recorded += len(events)
+
+    # Private methods below.
+
+    async def _run(self):
+        next_prune = self.loop.time()
+        next_archive_flush = self.loop.time() + self.archive_interval
+
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(
+                    self._wake_up.wait(),
+                    self.flush_interval,
+                    loop=self.loop,
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            self._wake_up.clear()
+
+            if self._stopping:
+                break
+
+            try:
+                await self.flush()
+
+                if self.database and self.retention is not None and \
+                        self.loop.time() >= next_prune:
+                    next_prune = self.loop.time() + self.prune_interval
+                    count = await self.database.prune_events(
+                        before=time.time() - self.retention,
+                    )
+
+                    if count:
+                        logger.debug("Pruned %s expired event(s).", count)
+
+                if self.archive and self.loop.time() >= next_archive_flush:
+                    next_archive_flush = \
+                        self.loop.time() + self.archive_interval
+                    await self.loop.run_in_executor(None, self.archive.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Unexpected error while recording events.")
@@ -5,6 +5,7 @@ Implemented according to:
 http://cache.insteon.com/developer/2413dev-042007-en.pdf
 """
 
+from collections import namedtuple
 from enum import IntEnum
 
 from .exceptions import CommandFailure
@@ -24,8 +25,8 @@ class CommandCode(IntEnum):
     # Messages sent from IM to host.
     #
     # If you add commands here you MUST also update the `BODY_SIZES` dictionary
-    # below. Failure to do so will result in a crash upon reception of those
-    # messages.
+    # below. Failure to do so will result in those messages being discarded
+    # upon reception.
     standard_message_received = 0x50
     extended_message_received = 0x51
     x10_received = 0x52
@@ -40,7 +41,7 @@ class CommandCode(IntEnum):
     #
     # If you add commands here you MUST also update the `BODY_SIZES` dictionary
     # below with the size for the RESPONSE messages, not the REQUESTS. Failure
-    # to do so will result in a crash upon reception of those responses.
+    # to do so will result in those responses being discarded upon reception.
     get_im_info = 0x60
     send_all_link_command = 0x61
     send_standard_or_extended_message = 0x62
@@ -63,6 +64,13 @@ class CommandCode(IntEnum):
     get_im_configuration = 0x73
 
 
+# Command codes of the messages that carry an Insteon message.
+INSTEON_COMMAND_CODES = (
+    CommandCode.standard_message_received,
+    CommandCode.extended_message_received,
+)
+
+
 BODY_SIZES = {
     # Messages sent from IM to host.
     CommandCode.standard_message_received: 9,
@@ -84,6 +92,65 @@ BODY_SIZES = {
     CommandCode.send_standard_or_extended_message: 7,
 }
 
+# Command codes whose body grows by `EXTENSION_SIZE` bytes when the Insteon
+# message they contain has the extended flag set.
+EXTENSIBLE_COMMAND_CODES = {
+    CommandCode.send_standard_or_extended_message,
+}
+EXTENSION_SIZE = 14
+
+
+class FrameSpec(namedtuple('_FrameSpec', [
+    'command_code',
+    'body_size',
+    'extensible',
+])):
+    """
+    Describes how to decode the frame for a given command code.
+    """
+
+
+def _build_frame_specs():
+    """
+    Build the frame specifications lookup table.
+
+    :returns: A list of 256 entries, indexed by command code byte. Entries are
+        either a `FrameSpec` instance or `None` if the command code is not
+        supported.
+    """
+    frame_specs = [None] * 256
+
+    for command_code, body_size in BODY_SIZES.items():
+        frame_specs[command_code.value] = FrameSpec(
+            command_code=command_code,
+            body_size=body_size,
+            extensible=command_code in EXTENSIBLE_COMMAND_CODES,
+        )
+
+    return frame_specs
+
+
+FRAME_SPECS = _build_frame_specs()
+
+
+def get_body_size(frame_spec, buffer, offset=0):
+    """
+    Get the body size of a frame.
+
+    :param frame_spec: The `FrameSpec` of the frame.
+    :param buffer: The buffer that contains the frame.
+    :param offset: The offset of the frame start in `buffer`.
+    :returns: The body size. For an extensible frame whose flags byte is not
+        available yet, the base body size is returned.
+    """
+    # If the message is an Insteon message and has the extended flag, we expect
+    # 14 user-data more bytes.
+    if frame_spec.extensible and len(buffer) - offset >= 6 and \
+            buffer[offset + 5] & (1 << 4):
+        return frame_spec.body_size + EXTENSION_SIZE
+
+    return frame_spec.body_size
+
 
 class MessageFailure(RuntimeError):
     """
@@ -102,7 +169,7 @@ class BaseMessage(object):
     """
     def __init__(self, command_code, body=b''):
         self.command_code = command_code
-        self.body = bytearray(body)
+        self.body = body
 
     def __eq__(self, value):
         if not isinstance(value, BaseMessage):
@@ -121,7 +188,11 @@ class BaseMessage(object):
 class IncomingMessage(BaseMessage):
     """
     Represents an incoming message.
+
+    For messages that carry an Insteon message, `insteon_message` is set to
+    the decoded `InsteonMessage` upon reception.
     """
+    insteon_message = None
 
     def __str__(self):
         if self.body:
@@ -205,9 +276,9 @@ def parse_message(buffer):
     if len(buffer) < 2:
         return None, 2 - len(buffer)
 
-    try:
-        command_code = CommandCode(buffer[1])
-    except ValueError:
+    frame_spec = FRAME_SPECS[buffer[1]]
+
+    if frame_spec is None:
         logger.warning(
             "Unrecognized command code (0x%02x). Ignoring invalid data.",
             buffer[1],
@@ -216,17 +287,9 @@ def parse_message(buffer):
 
         return None, 2
 
-    extension = 0
-
-    # If the message is an Insteon message and has the extended flag, we expect
-    # 14 user-data more bytes.
-    if command_code == CommandCode.send_standard_or_extended_message:
-        if len(buffer) >= 6 and buffer[5] & (1 << 4):
-            extension = 14
-
     body, expected = _extract_body(
         buffer,
-        BODY_SIZES[command_code] + extension,
+        get_body_size(frame_spec, buffer),
     )
 
     # Not enough bytes to process the message. Let's wait for more.
@@ -234,11 +297,113 @@ def parse_message(buffer):
         return None, expected
 
     return (
-        IncomingMessage(command_code=command_code, body=body),
+        IncomingMessage(command_code=frame_spec.command_code, body=body),
         max(2 - len(buffer), 1),
     )
 
 
+class FrameDecoder(object):
+    """
+    A stateful decoder that extracts messages from a stream of bytes.
+
+    Unlike `parse_messages`, the decoder never shrinks its buffer once per
+    message: it keeps a read offset into the data it was fed and only
+    compacts the leftover bytes (typically an incomplete message) when new data
+    comes in. Message bodies are `memoryview` instances over the fed data and
+    are never copied.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._offset = 0
+
+    def __len__(self):
+        return len(self._buffer) - self._offset
+
+    def feed(self, data):
+        """
+        Feed some bytes to the decoder.
+
+        :param data: The bytes to feed.
+        """
+        if self._offset < len(self._buffer):
+            self._buffer = self._buffer[self._offset:] + data
+        else:
+            self._buffer = bytes(data)
+
+        self._offset = 0
+
+    def decode(self):
+        """
+        Decode all the complete messages from the fed bytes.
+
+        :returns: A tuple (messages, expected). `expected` is the minimum
+            number of bytes to read next.
+        """
+        messages = []
+        buffer = self._buffer
+        view = memoryview(buffer)
+        size = len(buffer)
+        offset = self._offset
+        frame_specs = FRAME_SPECS
+
+        while True:
+            if offset == size:
+                expected = 2
+                break
+
+            if buffer[offset] != MESSAGE_START_BYTE and \
+                    buffer[offset] != MESSAGE_FAILURE_BYTE:
+                start = _find_message_start(buffer, offset)
+                _log_discarded_bytes(buffer[offset:start])
+                offset = start
+                continue
+
+            if buffer[offset] == MESSAGE_FAILURE_BYTE:
+                offset += 1
+                messages.append(MessageFailure(
+                    'Command send failure (probable collision). Expect a '
+                    'retry.',
+                ))
+                continue
+
+            # It takes at least 2 bytes to move forward.
+            if size - offset < 2:
+                expected = 2 - (size - offset)
+                break
+
+            frame_spec = frame_specs[buffer[offset + 1]]
+
+            if frame_spec is None:
+                logger.warning(
+                    "Unrecognized command code (0x%02x). Ignoring invalid "
+                    "data.",
+                    buffer[offset + 1],
+                )
+                offset += 2
+                continue
+
+            body_size = get_body_size(frame_spec, buffer, offset)
+
+            # We account for the message start and command code bytes, hence
+            # the +2.
+            if size - offset < body_size + 2:
+                expected = body_size + 2 - (size - offset)
+                break
+
+            messages.append(
+                IncomingMessage(
+                    command_code=frame_spec.command_code,
+                    body=view[offset + 2:offset + 2 + body_size],
+                ),
+            )
+            offset += body_size + 2
+
+        self._offset = offset
+
+        return messages, expected
+
+
 def format_message(command_code, body=b''):
     """
     Format a message for writing on the PLM.
@@ -269,14 +434,42 @@ def _discard_until_message_start(buffer):
 
     if discarded_bytes:
         buffer[:len(discarded_bytes)] = []
-        discarded_bytes = discarded_bytes.lstrip(b'\x00')
+        _log_discarded_bytes(discarded_bytes)
 
-        if discarded_bytes:
-            logger.warning(
-                "Discarding %s unexpected byte(s): %s",
-                len(discarded_bytes),
-                discarded_bytes.hex(),
-            )
+
+def _find_message_start(buffer, offset):
+    """
+    Find the index of the next message start or failure byte.
+
+    :param buffer: The buffer to search.
+    :param offset: The index to start searching from.
+    :returns: The index of the next message start or failure byte, or the
+        buffer size if there is none.
+    """
+    indexes = [
+        index for index in (
+            buffer.find(MESSAGE_START_BYTE, offset),
+            buffer.find(MESSAGE_FAILURE_BYTE, offset),
+        ) if index >= 0
+    ]
+
+    return min(indexes) if indexes else len(buffer)
+
+
+def _log_discarded_bytes(discarded_bytes):
+    """
+    Log unexpected discarded bytes, ignoring null padding.
+
+    :param discarded_bytes: The discarded bytes.
+    """
+    discarded_bytes = discarded_bytes.lstrip(b'\x00')
+
+    if discarded_bytes:
+        logger.warning(
+            "Discarding %s unexpected byte(s): %s",
+            len(discarded_bytes),
+            discarded_bytes.hex(),
+        )
 
 
 def _extract_body(buffer, size):
@@ -4,6 +4,7 @@ Objects.
 
 from collections import namedtuple
 from itertools import chain
+from operator import itemgetter
 from enum import (
     Enum,
     IntEnum,
@@ -418,7 +419,7 @@ def parse_all_link_record_response(value):
         identity=Identity(value[2:5]),
         group=value[1],
         role=AllLinkRole(bool(value[0] & 0x40)),
-        data=value[5:8],
+        data=bytes(value[5:8]),
     )
 
 
@@ -478,53 +479,158 @@ class InsteonMessageFlag(IntEnum):
     broadcast = 7
 
 
-class InsteonMessage(
-    namedtuple(
-        '_InsteonMessage',
-        [
-            'sender',
-            'target',
-            'hops_left',
-            'max_hops',
-            'flags',
-            'command_bytes',
-            'user_data',
-        ],
-    ),
-):
-    @classmethod
-    def from_message_body(cls, body):
-        flags_byte = body[6]
-        max_hops = flags_byte & 0x03
-        hops_left = (flags_byte & 0x0c) >> 2
-        flags = {
+def _build_flags_sets():
+    """
+    Build the flags sets lookup table.
+
+    :returns: A tuple of 16 frozensets of `InsteonMessageFlag`, indexed by the
+        upper nibble of a flags byte.
+    """
+    return tuple(
+        frozenset(
             flag for flag in InsteonMessageFlag
-            if (flags_byte & (1 << flag.value)) != 0
-        }
-
-        return cls(
-            sender=Identity(body[0:3]),
-            target=Identity(body[3:6]),
-            hops_left=hops_left,
-            max_hops=max_hops,
-            flags=flags,
-            command_bytes=body[7:9],
-            user_data=body[9:],
+            if (nibble << 4) & (1 << flag.value)
         )
+        for nibble in range(16)
+    )
 
-    def to_message_body(self):
-        flags_byte = (self.max_hops & 0x03) | (self.hops_left & 0x03) << 2
 
-        for flag in self.flags:
+FLAGS_SETS = _build_flags_sets()
+EXTENDED_MASK = 1 << InsteonMessageFlag.extended.value
+ACK_MASK = 1 << InsteonMessageFlag.ack.value
+ALL_LINK_MASK = 1 << InsteonMessageFlag.all_link.value
+BROADCAST_MASK = 1 << InsteonMessageFlag.broadcast.value
+# The flags that make the type of a message (direct, ACK, broadcast...).
+MESSAGE_TYPE_MASK = BROADCAST_MASK | ALL_LINK_MASK | ACK_MASK
+
+# The maximum number of cached identities. Insteon networks rarely have more
+# than a few hundred devices.
+IDENTITY_CACHE_SIZE = 1024
+
+_identity_cache = {}
+
+
+def _get_identity(value):
+    """
+    Get an `Identity` instance, from a cache if possible.
+
+    :param value: A 3-bytes long bytes instance.
+    :returns: The `Identity` instance.
+    """
+    identity = _identity_cache.get(value)
+
+    if identity is None:
+        identity = Identity(value)
+
+        if len(_identity_cache) < IDENTITY_CACHE_SIZE:
+            _identity_cache[value] = identity
+
+    return identity
+
+
+class InsteonMessage(tuple):
+    """
+    An immutable Insteon message.
+
+    The hops and flags are stored as a single flags byte, from which the
+    `hops_left`, `max_hops` and `flags` attributes are computed on access.
+    """
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        sender,
+        target,
+        hops_left,
+        max_hops,
+        flags,
+        command_bytes,
+        user_data,
+    ):
+        flags_byte = (max_hops & 0x03) | (hops_left & 0x03) << 2
+
+        for flag in flags:
             flags_byte |= (1 << flag.value)
 
+        return tuple.__new__(
+            cls,
+            (sender, target, flags_byte, command_bytes, user_data),
+        )
+
+    @classmethod
+    def from_message_body(cls, body):
+        return tuple.__new__(cls, (
+            _get_identity(bytes(body[0:3])),
+            _get_identity(bytes(body[3:6])),
+            body[6],
+            bytes(body[7:9]),
+            bytes(body[9:]),
+        ))
+
+    def __getnewargs__(self):
+        return (
+            self.sender,
+            self.target,
+            self.hops_left,
+            self.max_hops,
+            self.flags,
+            self.command_bytes,
+            self.user_data,
+        )
+
+    sender = property(itemgetter(0))
+    target = property(itemgetter(1))
+    flags_byte = property(itemgetter(2))
+    command_bytes = property(itemgetter(3))
+    user_data = property(itemgetter(4))
+
+    @property
+    def hops_left(self):
+        return (self[2] & 0x0c) >> 2
+
+    @property
+    def max_hops(self):
+        return self[2] & 0x03
+
+    @property
+    def flags(self):
+        return FLAGS_SETS[self[2] >> 4]
+
+    @property
+    def is_extended(self):
+        return bool(self[2] & EXTENDED_MASK)
+
+    @property
+    def is_ack(self):
+        return bool(self[2] & ACK_MASK)
+
+    @property
+    def is_all_link(self):
+        return bool(self[2] & ALL_LINK_MASK)
+
+    @property
+    def is_broadcast(self):
+        return bool(self[2] & BROADCAST_MASK)
+
+    def to_message_body(self):
         return bytes(chain(
             self.target,
-            [flags_byte],
+            [self.flags_byte],
             self.command_bytes,
             self.user_data or b'',
         ))
 
+    def __repr__(self):
+        return (
+            "InsteonMessage(sender={self.sender!r}, target={self.target!r}, "
+            "hops_left={self.hops_left!r}, max_hops={self.max_hops!r}, "
+            "flags={flags!r}, command_bytes={self.command_bytes!r}, "
+            "user_data={self.user_data!r})"
+        ).format(
+            self=self,
+            flags=set(self.flags),
+        )
+
     def __str__(self):
         return (
             "{self.sender} -> {self.target} "
@@ -533,11 +639,35 @@ class InsteonMessage(
         ).format(
             self=self,
             command_bytes=self.command_bytes.hex(),
-            flags=', '.join(flag.name for flag in self.flags),
+            flags=', '.join(
+                flag.name for flag in InsteonMessageFlag
+                if flag in self.flags
+            ),
             user_data=self.user_data.hex(),
         )
 
 
+def parse_id_response(insteon_message):
+    """
+    Parse the answer of a device to an ID request.
+
+    :param insteon_message: The broadcast `InsteonMessage` sent by the device
+        in response to the ID request.
+    :returns: A dict containing the identity, device category, device
+        subcategory and firmware version of the device.
+    """
+    category, subcategory = parse_device_categories(
+        insteon_message.target[0:2],
+    )
+
+    return {
+        'identity': insteon_message.sender,
+        'category': category,
+        'subcategory': subcategory,
+        'firmware_version': insteon_message.target[2],
+    }
+
+
 class DeviceInfo(IntEnum):
     x10_address = 0x04
     ramp_rate = 0x05
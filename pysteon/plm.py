@@ -4,8 +4,12 @@ PowerLine Modem interface.
 
 import asyncio
 
+from collections import Counter
 from contextlib import contextmanager
-from functools import partial
+from functools import (
+    partial,
+    wraps,
+)
 from itertools import chain
 from pyslot.thread_safe_signal import ThreadSafeSignal as Signal
 from serial import (
@@ -14,20 +18,27 @@ from serial import (
     STOPBITS_ONE,
     serial_for_url,
 )
-from threading import (
-    Event,
-    Thread,
-)
 
-from .exceptions import CommandFailure
+from .dispatcher import (
+    DuplicateFilter,
+    MessageDispatcher,
+    OverflowPolicy,
+    ReplyCorrelator,
+    SubscriberQueue,
+)
+from .exceptions import (
+    CommandFailure,
+    CommandTimeout,
+    TransmissionFailure,
+)
 from .log import logger as main_logger
 from .messaging import (
+    INSTEON_COMMAND_CODES,
     CommandCode,
     MessageFailure,
     OutgoingMessage,
     check_ack_or_nak,
     format_message,
-    parse_messages,
 )
 from .objects import (
     AllLinkMode,
@@ -38,7 +49,10 @@ from .objects import (
     InsteonMessageFlag,
     parse_all_link_record_response,
     parse_device_categories,
+    parse_id_response,
 )
+from .retry import RetryPolicy
+from .transport import create_transport
 from .units import (
     led_brightness_from_percent,
     led_brightness_to_percent,
@@ -51,17 +65,88 @@ from .units import (
 logger = main_logger.getChild('serial')
 
 
+def with_timeout(func):
+    """
+    Make a `PowerLineModem` coroutine method accept a `timeout` keyword
+    argument.
+
+    When the timeout expires, the coroutine is cancelled, which releases the
+    subscriptions, expected replies and locks it holds, and a `CommandTimeout`
+    is raised.
+
+    :param func: The coroutine method to decorate.
+    :returns: The decorated coroutine method.
+    """
+    @wraps(func)
+    async def wrapper(self, *args, timeout=None, **kwargs):
+        if timeout is None:
+            return await func(self, *args, **kwargs)
+
+        try:
+            return await asyncio.wait_for(
+                func(self, *args, **kwargs),
+                timeout,
+                loop=self.loop,
+            )
+        except CommandTimeout:
+            raise
+        except asyncio.TimeoutError:
+            raise CommandTimeout(operation=func.__name__, timeout=timeout)
+
+    return wrapper
+
+
 class PowerLineModem(object):
     """
     Represents a PowerLine Modem that responds and controls Insteon devices.
+
+    All the coroutine methods that talk to the PLM accept an optional
+    `timeout` keyword argument, in seconds. See `with_timeout`.
     """
-    def __init__(self, serial_port_url, on_message=None, loop=None):
+    def __init__(
+        self,
+        serial_port_url,
+        on_message=None,
+        loop=None,
+        use_thread=None,
+        retry_policy=None,
+        retry_policies=None,
+        duplicate_window=0.5,
+    ):
+        """
+        :param serial_port_url: The serial port URL of the PLM.
+        :param on_message: An optional callback to connect to `on_message`.
+        :param loop: The event loop to use.
+        :param use_thread: A flag that if set, forces reading the serial port
+            from a dedicated thread. By default, all serial I/O happens on the
+            event loop when the serial port is selectable.
+        :param retry_policy: The default `RetryPolicy` for failed writes.
+        :param retry_policies: An optional dict of `RetryPolicy` instances by
+            command code, that take precedence over `retry_policy`.
+        :param duplicate_window: The time, in seconds, during which
+            consecutive repeats of an Insteon message are suppressed. Replies
+            to pending requests and ACKs are never suppressed. If `None`, no
+            message is suppressed. Suppressed messages are counted in
+            `metrics['duplicates_suppressed']`.
+        """
         assert serial_port_url
 
         self.serial_port_url = serial_port_url
         self.loop = loop or asyncio.get_event_loop()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_policies = dict(retry_policies or {})
+        self.metrics = Counter()
         self.on_message = Signal()
         self.on_insteon_message = Signal()
+        self._dispatcher = MessageDispatcher()
+        self._correlator = ReplyCorrelator()
+        self._duplicate_filter = (
+            DuplicateFilter(window=duplicate_window)
+            if duplicate_window else None
+        )
+        self._reading_pauses = 0
+        self._reading_paused = False
+        self._responses_awaited = 0
 
         self.on_message.connect(partial(logger.debug, "%s"))
         self.on_message.connect(self._handle_message)
@@ -79,11 +164,14 @@ class PowerLineModem(object):
             timeout=1,
         )
         self._flush()
-        self.__must_stop = Event()
-        self.__thread = Thread(target=self._run)
-        self.__thread.daemon = True
-        self.__thread.start()
+        self._transport = create_transport(
+            serial=self._serial,
+            loop=self.loop,
+            on_messages=self._emit_messages,
+            use_thread=use_thread,
+        )
         self.__write_lock = asyncio.Lock(loop=self.loop)
+        self.__all_link_records_lock = asyncio.Lock(loop=self.loop)
         self.__monitor_interrupt = asyncio.Event(loop=self.loop)
 
         logger.debug("Querying PLM's information...")
@@ -107,9 +195,8 @@ class PowerLineModem(object):
 
     def close(self):
         self.interrupt()
-        self.__must_stop.set()
-        self.__thread.join()
-        self.__thread = None
+        self._transport.close()
+        self._transport = None
         self._serial.close()
         self._serial = None
 
@@ -123,107 +210,183 @@ class PowerLineModem(object):
         message = OutgoingMessage(*args, **kwargs)
         logger.debug("%s", message)
 
-        self._serial.write(
+        self._transport.write(
             format_message(
                 command_code=message.command_code,
                 body=message.body,
             ),
         )
-        self._serial.flushOutput()
 
     @contextmanager
-    def read(self, command_codes=None, handle_failures=False):
+    def read(
+        self,
+        command_codes=None,
+        handle_failures=False,
+        senders=None,
+        maxsize=0,
+        overflow=OverflowPolicy.block,
+    ):
         """
         Read from the PLM.
 
         :param command_codes: An optional list of command codes to filter
             messages.
-        :yields: A queue of messages that were read.
+        :param handle_failures: A flag that if set, causes failures to be read
+            as well.
+        :param senders: An optional list of identities to filter Insteon
+            messages.
+        :param maxsize: The maximum size of the queue. If 0, the queue is
+            unbounded.
+        :param overflow: The `OverflowPolicy` to apply when the queue is full.
+            With `OverflowPolicy.block`, the PLM stops reading the serial port
+            until the queue is drained, unless a request awaits a response.
+        :yields: A `SubscriberQueue` of messages that were read.
         """
-        queue = asyncio.Queue(loop=self.loop)
-
-        def read_one(message):
-            if handle_failures and isinstance(message, Exception):
-                queue.put_nowait(message)
-            elif command_codes is None or message.command_code in command_codes:
-                queue.put_nowait(message)
-
-        self.on_message.connect(read_one)
+        queue = self._create_queue(maxsize=maxsize, overflow=overflow)
+        subscription = self._dispatcher.subscribe(
+            queue.put_nowait,
+            command_codes=command_codes,
+            senders=senders,
+            handle_failures=handle_failures,
+        )
 
         try:
             yield queue
         finally:
-            self.on_message.disconnect(read_one)
+            self._dispatcher.unsubscribe(subscription)
+            queue.close()
 
+    @with_timeout
     async def write_read(
         self,
         *,
         command_code,
         body=None,
         command_codes=None,
-        retry_delay=0.5
+        retry_policy=None
     ):
         """
         Perform a write-read sequence with automatic retry on failure.
 
+        Only the write and the wait for the PLM response are serialized with
+        other commands: a failed command waits for its retry without
+        preventing other commands from being sent in the meantime.
+
+        Retries are counted in `metrics` under the `('retries',
+        command_code)` key and abandoned writes under the
+        `('transmission_failures', command_code)` key.
+
         :param command_code: The command code to write.
         :param body: The body to send.
         :param command_codes: An optional list of command codes to accept as
             responses.
+        :param retry_policy: The `RetryPolicy` to use. If `None`, the policy
+            for `command_code` in `retry_policies` is used, or `retry_policy`
+            if there is none.
         :returns: The first response.
         """
-        async with self.__write_lock:
-            try:
-                with self.read(
-                    command_codes=command_codes,
-                    handle_failures=True,
-                ) as queue:
-                    response = None
+        if retry_policy is None:
+            retry_policy = self.retry_policies.get(
+                command_code,
+                self.retry_policy,
+            )
 
-                    while not response:
-                        self.write(command_code=command_code, body=body or b'')
-                        response = await queue.get()
+        start = self.loop.time()
+        attempt = 1
 
-                        if isinstance(response, MessageFailure):
-                            logger.debug("Write operation failed. Retrying...")
-                            response = None
-                            await asyncio.sleep(retry_delay)
-            except Exception:
-                self._flush()
-                raise
+        while True:
+            response = await self._transmit(
+                command_code=command_code,
+                body=body or b'',
+                command_codes=command_codes,
+            )
 
-        return response
+            if not isinstance(response, MessageFailure):
+                return response
+
+            delay = retry_policy.next_delay(
+                attempt=attempt,
+                elapsed=self.loop.time() - start,
+            )
+
+            if delay is None:
+                self.metrics['transmission_failures', command_code] += 1
+
+                raise TransmissionFailure(
+                    command_code=command_code,
+                    attempts=attempt,
+                )
+
+            logger.debug(
+                "Write operation failed. Retrying in %.3f second(s)...",
+                delay,
+            )
+            self.metrics['retries', command_code] += 1
+            attempt += 1
+            await asyncio.sleep(delay, loop=self.loop)
 
     @contextmanager
-    def read_insteon_messages(self):
+    def read_insteon_messages(
+        self,
+        senders=None,
+        maxsize=0,
+        overflow=OverflowPolicy.block,
+    ):
         """
         Context manager that reads Insteon messages.
+
+        :param senders: An optional list of identities to filter messages.
+        :param maxsize: The maximum size of the queue. If 0, the queue is
+            unbounded.
+        :param overflow: The `OverflowPolicy` to apply when the queue is full.
+            See `read`.
+        :yields: A `SubscriberQueue` of Insteon messages that were read.
         """
-        async def read_queue(queue, insteon_queue):
-            while True:
-                response = await queue.get()
-                insteon_message = InsteonMessage.from_message_body(
-                    response.body,
-                )
-                insteon_queue.put_nowait(insteon_message)
+        queue = self._create_queue(maxsize=maxsize, overflow=overflow)
+        subscription = self._dispatcher.subscribe(
+            lambda message: queue.put_nowait(message.insteon_message),
+            command_codes=INSTEON_COMMAND_CODES,
+            senders=senders,
+        )
 
-        insteon_queue = asyncio.Queue(loop=self.loop)
+        try:
+            yield queue
+        finally:
+            self._dispatcher.unsubscribe(subscription)
+            queue.close()
 
-        with self.read(
-            command_codes=[
-                CommandCode.standard_message_received,
-                CommandCode.extended_message_received,
-            ],
-        ) as queue:
-            read_queue_task = asyncio.ensure_future(
-                read_queue(queue, insteon_queue),
-            )
+    @contextmanager
+    def expect_reply(self, sender, command=None, flags=(), not_flags=()):
+        """
+        Context manager that expects an Insteon message reply.
 
-            try:
-                yield insteon_queue
-            finally:
-                read_queue_task.cancel()
+        The expectation must be registered before the request is sent, to
+        avoid missing the reply.
+
+        :param sender: The identity of the device expected to reply.
+        :param command: The expected first command byte. If `None`, any
+            command matches.
+        :param flags: The `InsteonMessageFlag` that must be set.
+        :param not_flags: The `InsteonMessageFlag` that must not be set.
+        :yields: A future that completes with the `InsteonMessage` reply.
+        """
+        future = asyncio.Future(loop=self.loop)
+        expectation = self._correlator.expect(
+            future,
+            sender=sender,
+            command=command,
+            flags=flags,
+            not_flags=not_flags,
+        )
 
+        try:
+            with self._awaiting_response():
+                yield future
+        finally:
+            self._correlator.discard(expectation)
+            future.cancel()
+
+    @with_timeout
     async def get_info(self):
         """
         Get the PLM information.
@@ -250,46 +413,51 @@ class PowerLineModem(object):
             'firmware_version': firmware_version,
         }
 
-    async def get_all_link_records(self):
+    @with_timeout
+    async def get_all_link_records(self, step_timeout=None):
         """
         Get all controllers and responders associated to the PLM.
 
+        The PLM returns the records one at a time, so reading them all takes
+        one round trip per record.
+
+        :param step_timeout: An optional time, in seconds, to wait for each
+            record. Unlike `timeout`, it does not depend on the number of
+            records.
         :returns: A tuple (controllers, responders).
         """
         controllers = []
         responders = []
 
         try:
-            async with self.__write_lock:
+            async with self.__all_link_records_lock:
                 read_command_code = CommandCode.get_first_all_link_record
 
                 while True:
-                    with self.read(
-                        command_codes=[
-                            read_command_code,
-                            CommandCode.all_link_record_response,
-                        ],
-                    ) as queue:
-                        self.write(read_command_code)
-                        response = await queue.get()
-                        check_ack_or_nak(response)
-
-                        response = await queue.get()
-                        record = parse_all_link_record_response(response.body)
-
-                        if record.role == AllLinkRole.controller:
-                            controllers.append(record)
-                        else:
-                            responders.append(record)
-
-                        read_command_code = \
-                            CommandCode.get_next_all_link_record
+                    response = await self._read_all_link_record(
+                        read_command_code,
+                        timeout=step_timeout,
+                    )
+                    record = parse_all_link_record_response(response.body)
+
+                    if record.role == AllLinkRole.controller:
+                        controllers.append(record)
+                    else:
+                        responders.append(record)
+
+                    read_command_code = CommandCode.get_next_all_link_record
         except CommandFailure:
             # A NAK is generated to signal the end of the records.
             pass
+        except CommandTimeout as ex:
+            raise CommandTimeout(
+                operation='get_all_link_records',
+                timeout=ex.timeout,
+            ) from None
 
         return sorted(controllers), sorted(responders)
 
+    @with_timeout
     async def start_all_linking_session(self, group, mode=AllLinkMode.auto):
         """
         Start an all-linking session.
@@ -311,6 +479,7 @@ class PowerLineModem(object):
             mode,
         )
 
+    @with_timeout
     async def cancel_all_linking_session(self):
         """
         Cancel an all-linking session.
@@ -351,19 +520,64 @@ class PowerLineModem(object):
             self.__monitor_interrupt.set()
             logger.debug("Monitoring interrupted.")
 
-    async def monitor(self, on_event_callback):
+    async def monitor(
+        self,
+        on_event_callback,
+        workers=4,
+        maxsize=64,
+        overflow=OverflowPolicy.block,
+    ):
+        """
+        Call a coroutine function for every Insteon message sent to the PLM,
+        until `interrupt` is called.
+
+        Messages are handled by a fixed number of worker tasks. All the
+        messages from a given device are handled by the same worker, in the
+        order they were received.
+
+        :param on_event_callback: The coroutine function to call with each
+            `InsteonMessage`.
+        :param workers: The number of worker tasks.
+        :param maxsize: The maximum number of messages waiting for each
+            worker.
+        :param overflow: The `OverflowPolicy` to apply when a worker falls
+            behind. See `read`.
+        """
         self.__monitor_interrupt.clear()
 
-        callback = partial(
-            self._monitor_message,
-            on_event_callback=on_event_callback,
-        )
-        self.on_message.connect(callback)
+        queues = [
+            self._create_queue(maxsize=maxsize, overflow=overflow)
+            for _ in range(workers)
+        ]
+        tasks = [
+            asyncio.ensure_future(
+                self._monitor_worker(
+                    queue=queue,
+                    on_event_callback=on_event_callback,
+                ),
+                loop=self.loop,
+            )
+            for queue in queues
+        ]
+        callback = partial(self._monitor_message, queues=queues)
+        self.on_insteon_message.connect(callback)
 
         try:
             await self.__monitor_interrupt.wait()
         finally:
-            self.on_message.disconnect(callback)
+            self.on_insteon_message.disconnect(callback)
+
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(
+                *tasks,
+                loop=self.loop,
+                return_exceptions=True
+            )
+
+            for queue in queues:
+                queue.close()
 
     def wait_all_linking_completed(self):
         """
@@ -399,6 +613,7 @@ class PowerLineModem(object):
 
         return future
 
+    @with_timeout
     async def send_standard_or_extended_message(self, message):
         """
         Send a standard or extended message to the specified device.
@@ -414,42 +629,45 @@ class PowerLineModem(object):
 
         return response
 
-    async def id_request(self, identity):
+    @with_timeout
+    async def send_id_request(self, identity):
         """
-        Send an ID request to the specified device.
+        Send an ID request to the specified device, without waiting for its
+        answer.
+
+        The device answers with a broadcast message that can be parsed with
+        `parse_id_response`.
 
         :param identity: The device identity.
         """
-        with self.read_insteon_messages() as queue:
-            await self.send_standard_or_extended_message(
-                message=InsteonMessage(
-                    sender=self.identity,
-                    target=identity,
-                    hops_left=2,
-                    max_hops=3,
-                    flags=set(),
-                    command_bytes=b'\x10\x00',
-                    user_data=b'',
-                )
+        await self.send_standard_or_extended_message(
+            message=InsteonMessage(
+                sender=self.identity,
+                target=identity,
+                hops_left=2,
+                max_hops=3,
+                flags=set(),
+                command_bytes=b'\x10\x00',
+                user_data=b'',
             )
+        )
 
-            while True:
-                insteon_message = await queue.get()
+    @with_timeout
+    async def id_request(self, identity):
+        """
+        Send an ID request to the specified device.
 
-                if insteon_message.sender == identity and \
-                        insteon_message.target != self.identity:
-                    category, subcategory = parse_device_categories(
-                        insteon_message.target[0:2],
-                    )
-                    firmware_version = insteon_message.target[2]
+        :param identity: The device identity.
+        """
+        with self.expect_reply(
+            identity,
+            flags={InsteonMessageFlag.broadcast},
+        ) as reply:
+            await self.send_id_request(identity)
 
-                    return {
-                        'identity': identity,
-                        'category': category,
-                        'subcategory': subcategory,
-                        'firmware_version': firmware_version,
-                    }
+            return parse_id_response(await reply)
 
+    @with_timeout
     async def light_on(self, identity, level=100.0, instant=False):
         """
         Send a light ON request to the specified device.
@@ -479,6 +697,7 @@ class PowerLineModem(object):
 
         return on_level_to_percent(byte_value)
 
+    @with_timeout
     async def light_off(self, identity, instant=False):
         """
         Send a light OFF request to the specified device.
@@ -505,6 +724,7 @@ class PowerLineModem(object):
 
         return 0
 
+    @with_timeout
     async def remote_enter_linking(self, identity, group=0x01):
         """
         Tell a remote device to enter linking mode.
@@ -528,6 +748,7 @@ class PowerLineModem(object):
             )
         )
 
+    @with_timeout
     async def remote_enter_unlinking(self, identity, group=0x01):
         """
         Tell a remote device to enter unlinking mode.
@@ -551,6 +772,7 @@ class PowerLineModem(object):
             )
         )
 
+    @with_timeout
     async def remote_set(self, identity):
         """
         Emulates a remote tap of a set button.
@@ -571,6 +793,7 @@ class PowerLineModem(object):
             )
         )
 
+    @with_timeout
     async def beep(self, identity):
         """
         Emulates a remote tap of a set button.
@@ -591,6 +814,7 @@ class PowerLineModem(object):
             )
         )
 
+    @with_timeout
     async def get_device_info(self, identity):
         """
         Get device information.
@@ -601,7 +825,16 @@ class PowerLineModem(object):
         command_bytes = bytes([0x2e, 0x00])
         user_data = bytes([0x00] * 14)
 
-        with self.read_insteon_messages() as queue:
+        with self.expect_reply(
+            identity,
+            command=command_bytes[0],
+            flags={InsteonMessageFlag.ack},
+        ) as ack, self.expect_reply(
+            identity,
+            command=command_bytes[0],
+            flags={InsteonMessageFlag.extended},
+            not_flags={InsteonMessageFlag.ack},
+        ) as reply:
             await self.send_standard_or_extended_message(
                 message=InsteonMessage(
                     sender=self.identity,
@@ -613,13 +846,9 @@ class PowerLineModem(object):
                     user_data=user_data,
                 )
             )
+            await ack
+            response = await reply
 
-            # First message is an ack.
-            response = await queue.get()
-            assert InsteonMessageFlag.ack in response.flags
-
-            # Second one is the actual answer.
-            response = await queue.get()
             return {
                 'x10_house_code': response.user_data[4],
                 'x10_unit_code': response.user_data[5],
@@ -630,6 +859,7 @@ class PowerLineModem(object):
                 ),
             }
 
+    @with_timeout
     async def set_device_info(self, identity, device_info, value):
         """
         Set device information.
@@ -669,7 +899,11 @@ class PowerLineModem(object):
         ))
         user_data = self._checksum(command_bytes, user_data)
 
-        with self.read_insteon_messages() as queue:
+        with self.expect_reply(
+            identity,
+            command=command_bytes[0],
+            flags={InsteonMessageFlag.ack},
+        ) as ack:
             await self.send_standard_or_extended_message(
                 message=InsteonMessage(
                     sender=self.identity,
@@ -681,10 +915,7 @@ class PowerLineModem(object):
                     user_data=user_data,
                 )
             )
-
-            # First message is an ack.
-            response = await queue.get()
-            assert InsteonMessageFlag.ack in response.flags
+            await ack
 
         return value
 
@@ -699,32 +930,113 @@ class PowerLineModem(object):
         s = sum(chain(command_bytes, user_data[:-1]))
         return bytes(chain(user_data[:-1], [((0xff ^ s) + 1) & 0xff]))
 
+    async def _transmit(self, command_code, body, command_codes):
+        async with self.__write_lock:
+            try:
+                with self.read(
+                    command_codes=command_codes,
+                    handle_failures=True,
+                ) as queue, self._awaiting_response():
+                    self.write(command_code=command_code, body=body)
+
+                    return await queue.get()
+            except asyncio.CancelledError:
+                # Other requests may be waiting for replies: don't flush.
+                raise
+            except Exception:
+                self._flush()
+                raise
+
+    def _create_queue(self, maxsize, overflow):
+        return SubscriberQueue(
+            maxsize=maxsize,
+            overflow=overflow,
+            on_pause=self._pause_reading,
+            on_resume=self._resume_reading,
+            loop=self.loop,
+        )
+
+    def _pause_reading(self):
+        self._reading_pauses += 1
+        self._update_reading()
+
+    def _resume_reading(self):
+        self._reading_pauses -= 1
+        self._update_reading()
+
+    @contextmanager
+    def _awaiting_response(self):
+        # Pausing the reading while a request awaits its response would
+        # deadlock any reader that sends requests before draining its queue.
+        self._responses_awaited += 1
+        self._update_reading()
+
+        try:
+            yield
+        finally:
+            self._responses_awaited -= 1
+            self._update_reading()
+
+    def _update_reading(self):
+        paused = bool(self._reading_pauses) and not self._responses_awaited
+
+        if paused == self._reading_paused or not self._transport:
+            return
+
+        self._reading_paused = paused
+
+        if paused:
+            logger.debug("A reader is full. Pausing the serial port reading.")
+            self.metrics['reading_paused'] += 1
+            self._transport.pause_reading()
+        else:
+            logger.debug("Resuming the serial port reading.")
+            self._transport.resume_reading()
+
     def _flush(self):
         self._serial.flushInput()
         self._serial.flushOutput()
 
-    def _run(self):
-        buffer = bytearray()
-        expected = 2
-
-        while not self.__must_stop.is_set():
+    def _emit_messages(self, messages):
+        # A failure must not prevent the other messages of the batch, nor
+        # the readers of this one, from getting their messages.
+        for message in messages:
             try:
-                data = self._serial.read(expected)
+                self._emit_message(message)
             except Exception:
                 logger.exception(
-                    "Unexpected error while reading from serial port.",
+                    "Unexpected error while handling %s.",
+                    message,
                 )
-            else:
-                if data:
-                    buffer.extend(data)
 
-                    messages, expected = parse_messages(buffer)
+    def _emit_message(self, message):
+        if message.command_code in INSTEON_COMMAND_CODES:
+            insteon_message = message.insteon_message = \
+                InsteonMessage.from_message_body(message.body)
 
-                    for message in messages:
-                        self.loop.call_soon_threadsafe(
-                            self.on_message.emit,
-                            message,
-                        )
+            if not self._correlator.resolve(insteon_message) and \
+                    self._is_duplicate(insteon_message):
+                return
+
+        try:
+            self.on_message.emit(message)
+        finally:
+            self._dispatcher.dispatch(message)
+
+    def _is_duplicate(self, insteon_message):
+        if self._duplicate_filter is None or insteon_message.is_ack:
+            return False
+
+        if self._duplicate_filter.is_duplicate(
+            insteon_message,
+            now=self.loop.time(),
+        ):
+            logger.debug("Suppressed duplicate %s.", insteon_message)
+            self.metrics['duplicates_suppressed'] += 1
+
+            return True
+
+        return False
 
     def _handle_message(self, message):
         if message.command_code == CommandCode.all_linking_completed:
@@ -748,22 +1060,41 @@ class PowerLineModem(object):
                 subcategory=subcategory,
                 firmware_version=firmware_version,
             )
-        elif message.command_code in {
-            CommandCode.standard_message_received,
-            CommandCode.extended_message_received,
-        }:
-            insteon_message = InsteonMessage.from_message_body(message.body)
-            self.on_insteon_message.emit(insteon_message)
-
-    def _monitor_message(self, message, on_event_callback):
-        if message.command_code in [
-            CommandCode.standard_message_received,
-            CommandCode.extended_message_received,
-        ]:
-            insteon_message = InsteonMessage.from_message_body(message.body)
-
-            if insteon_message.target == self.identity:
-                asyncio.ensure_future(on_event_callback(insteon_message))
+        elif message.command_code in INSTEON_COMMAND_CODES:
+            self.on_insteon_message.emit(message.insteon_message)
+
+    @with_timeout
+    async def _read_all_link_record(self, read_command_code):
+        with self.read(
+            command_codes=[CommandCode.all_link_record_response],
+        ) as queue, self._awaiting_response():
+            response = await self.write_read(
+                command_code=read_command_code,
+                command_codes=[read_command_code],
+            )
+            check_ack_or_nak(response)
+
+            return await queue.get()
+
+    def _monitor_message(self, insteon_message, queues):
+        if insteon_message.target == self.identity:
+            queues[hash(insteon_message.sender) % len(queues)].put_nowait(
+                insteon_message,
+            )
+
+    async def _monitor_worker(self, queue, on_event_callback):
+        while True:
+            insteon_message = await queue.get()
+
+            try:
+                await on_event_callback(insteon_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Unexpected error while handling %s.",
+                    insteon_message,
+                )
 
     def _handle_all_linking_completed(
         self,
@@ -0,0 +1,90 @@
+"""
+Retry policies.
+"""
+
+import random
+
+
+class RetryPolicy(object):
+    """
+    Describes when and how often a failed write is retried.
+
+    Delays grow exponentially from `initial_delay` up to `max_delay` and are
+    randomly shortened by up to `jitter` (a fraction of the delay) so that
+    devices that collided once don't keep colliding in lockstep.
+    """
+
+    def __init__(
+        self,
+        initial_delay=0.1,
+        max_delay=2.0,
+        multiplier=2.0,
+        jitter=0.5,
+        max_attempts=8,
+        deadline=None,
+    ):
+        """
+        :param initial_delay: The delay before the first retry, in seconds.
+        :param max_delay: The maximum delay between two attempts, in seconds.
+        :param multiplier: The factor applied to the delay after each retry.
+        :param jitter: The fraction of each delay that is randomized, between
+            0 and 1.
+        :param max_attempts: The maximum number of attempts, including the
+            first one. `None` means no limit.
+        :param deadline: The maximum time, in seconds, that may elapse from the
+            first attempt to the start of the last one. `None` means no limit.
+        """
+        assert 0 <= jitter <= 1
+
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+
+    def __repr__(self):
+        return (
+            "RetryPolicy(initial_delay={self.initial_delay!r}, "
+            "max_delay={self.max_delay!r}, multiplier={self.multiplier!r}, "
+            "jitter={self.jitter!r}, max_attempts={self.max_attempts!r}, "
+            "deadline={self.deadline!r})"
+        ).format(self=self)
+
+    def get_delay(self, attempt):
+        """
+        Get the delay before the attempt that follows a failed one.
+
+        :param attempt: The number of the attempt that failed, starting at 1.
+        :returns: The delay, in seconds.
+        """
+        delay = self.initial_delay
+
+        # Stop growing the delay once it reaches `max_delay`: raising the
+        # multiplier to the power of a large attempt number would overflow.
+        for _ in range(attempt - 1):
+            if delay >= self.max_delay:
+                break
+
+            delay *= self.multiplier
+
+        return min(self.max_delay, delay) * (1 - self.jitter * random.random())
+
+    def next_delay(self, attempt, elapsed):
+        """
+        Get the delay before retrying after a failed attempt.
+
+        :param attempt: The number of the attempt that failed, starting at 1.
+        :param elapsed: The time elapsed since the first attempt, in seconds.
+        :returns: The delay, in seconds, or `None` if the write must not be
+            retried.
+        """
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+
+        delay = self.get_delay(attempt)
+
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+
+        return delay
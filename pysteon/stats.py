@@ -0,0 +1,138 @@
+"""
+Events statistics.
+
+All the functions take the columns of an events archive, as returned by
+`ArchiveReader.read_columns`. This module requires NumPy.
+"""
+
+import numpy
+
+from collections import namedtuple
+
+from .database import identity_from_key
+
+GapsStatistics = namedtuple('GapsStatistics', (
+    'count',
+    'mean',
+    'minimum',
+    'maximum',
+))
+
+
+def filter_columns(columns, since=None, until=None):
+    """
+    Filter events by time.
+
+    :param columns: The events columns.
+    :param since: An optional timestamp of the oldest event to keep.
+    :param until: An optional timestamp after which events are excluded.
+    :returns: The filtered events columns.
+    """
+    timestamps = columns['timestamp']
+    mask = numpy.ones(len(timestamps), dtype=bool)
+
+    if since is not None:
+        mask &= timestamps >= int(since * 1000000)
+
+    if until is not None:
+        mask &= timestamps < int(until * 1000000)
+
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def get_device_counts(columns):
+    """
+    Count the events of each device.
+
+    :param columns: The events columns.
+    :returns: A list of (identity, count) tuples, most active devices first.
+    """
+    # Identities are 24-bit: counting them directly is much faster than
+    # sorting them.
+    counts = numpy.bincount(columns['sender'])
+    senders = numpy.flatnonzero(counts)
+    counts = counts[senders]
+    order = numpy.argsort(-counts, kind='mergesort')
+
+    return [
+        (identity_from_key(int(sender)), int(count))
+        for sender, count in zip(senders[order], counts[order])
+    ]
+
+
+def get_hourly_histogram(columns, utc_offset=0):
+    """
+    Count the events by hour of the day.
+
+    :param columns: The events columns.
+    :param utc_offset: The offset of the local time from UTC, in seconds.
+    :returns: A list of 24 counts.
+    """
+    hours = (columns['timestamp'] // 1000000 + utc_offset) // 3600 % 24
+
+    return numpy.bincount(hours, minlength=24).tolist()
+
+
+def get_inter_event_gaps(columns):
+    """
+    Compute statistics about the time between consecutive events of each
+    device.
+
+    :param columns: The events columns.
+    :returns: A dict of `GapsStatistics` by identity, with times in seconds.
+        Devices with a single event are omitted.
+    """
+    senders = columns['sender']
+    timestamps = columns['timestamp']
+
+    # Identities are 24-bit but a network only has a few of them: ranking
+    # them first makes the sort much faster.
+    present = numpy.bincount(senders) > 0
+    ranks = (numpy.cumsum(present) - 1).astype(
+        numpy.uint16 if present.sum() <= 1 << 16 else numpy.uint32,
+    )[senders]
+
+    # Archives are usually in chronological order already, in which case a
+    # stable sort by sender is enough.
+    if numpy.all(timestamps[1:] >= timestamps[:-1]):
+        order = numpy.argsort(ranks, kind='mergesort')
+    else:
+        order = numpy.argsort(timestamps, kind='mergesort')
+        order = order[numpy.argsort(ranks[order], kind='mergesort')]
+
+    senders = senders[order]
+    timestamps = timestamps[order]
+
+    same_sender = senders[1:] == senders[:-1]
+    gaps = numpy.diff(timestamps)[same_sender] / 1000000.0
+    senders = senders[1:][same_sender]
+
+    if not len(gaps):
+        return {}
+
+    # Gaps are sorted by sender: compute each device's statistics on its
+    # contiguous slice.
+    starts = numpy.concatenate((
+        [0],
+        numpy.flatnonzero(senders[1:] != senders[:-1]) + 1,
+    ))
+    counts = numpy.diff(numpy.concatenate((starts, [len(gaps)])))
+    sums = numpy.add.reduceat(gaps, starts)
+    minimums = numpy.minimum.reduceat(gaps, starts)
+    maximums = numpy.maximum.reduceat(gaps, starts)
+
+    return {
+        identity_from_key(int(sender)): GapsStatistics(
+            count=int(count),
+            mean=float(total / count),
+            minimum=float(minimum),
+            maximum=float(maximum),
+        )
+        for sender, count, total, minimum, maximum in zip(
+            senders[starts],
+            counts,
+            sums,
+            minimums,
+            maximums,
+        )
+    }
@@ -0,0 +1,250 @@
+"""
+Serial transports.
+
+A transport moves bytes between the PLM serial port and the event loop: it
+writes formatted messages and calls back with batches of decoded incoming
+messages, always on the event loop thread.
+"""
+
+import os
+
+from threading import (
+    Event,
+    Thread,
+)
+
+from .log import logger as main_logger
+from .messaging import FrameDecoder
+
+logger = main_logger.getChild('serial')
+
+
+def create_transport(serial, loop, on_messages, use_thread=None):
+    """
+    Create a transport for the specified serial port.
+
+    :param serial: The serial port instance.
+    :param loop: The event loop.
+    :param on_messages: A callable that will be called on the event loop
+        thread with a list of decoded messages.
+    :param use_thread: A flag that if set, forces the use of a reader thread.
+        If `None`, the serial port is read from the event loop whenever it
+        exposes a selectable file descriptor, and from a reader thread
+        otherwise.
+    :returns: A started transport instance.
+    """
+    if not use_thread:
+        try:
+            return LoopSerialTransport(
+                serial=serial,
+                loop=loop,
+                on_messages=on_messages,
+            )
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            if use_thread is not None:
+                raise
+
+            logger.debug(
+                "Serial port does not expose a selectable file descriptor. "
+                "Falling back to a reader thread.",
+            )
+
+    return ThreadedSerialTransport(
+        serial=serial,
+        loop=loop,
+        on_messages=on_messages,
+    )
+
+
+class ThreadedSerialTransport(object):
+    """
+    A transport that reads the serial port from a dedicated thread.
+
+    This works with any serial port but requires the serial port to have a
+    read timeout, which delays `close` by up to that timeout.
+    """
+
+    def __init__(self, serial, loop, on_messages):
+        self._serial = serial
+        self._loop = loop
+        self._on_messages = on_messages
+        self.__must_stop = Event()
+        self.__may_read = Event()
+        self.__may_read.set()
+        self.__thread = Thread(target=self._run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def close(self):
+        self.__must_stop.set()
+        self.__may_read.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def write(self, data):
+        """
+        Write data to the serial port.
+
+        :param data: The data to write.
+        """
+        self._serial.write(data)
+
+    def pause_reading(self):
+        """
+        Stop reading from the serial port until `resume_reading` is called.
+
+        Messages that were already read are still delivered.
+        """
+        self.__may_read.clear()
+
+    def resume_reading(self):
+        """
+        Resume reading from the serial port.
+        """
+        self.__may_read.set()
+
+    # Private methods below.
+
+    def _run(self):
+        decoder = FrameDecoder()
+        expected = 2
+
+        while not self.__must_stop.is_set():
+            self.__may_read.wait()
+
+            try:
+                # Drain whatever is already waiting in a single read: this
+                # only blocks when there is less than `expected` available.
+                data = self._serial.read(
+                    max(expected, self._serial.in_waiting),
+                )
+            except Exception:
+                logger.exception(
+                    "Unexpected error while reading from serial port.",
+                )
+            else:
+                if data:
+                    decoder.feed(data)
+                    messages, expected = decoder.decode()
+
+                    if messages:
+                        self._loop.call_soon_threadsafe(
+                            self._on_messages,
+                            messages,
+                        )
+
+
+class LoopSerialTransport(object):
+    """
+    A transport that performs all serial I/O on the event loop.
+
+    The serial port file descriptor is watched with `loop.add_reader` and
+    written to without blocking, using `loop.add_writer` to send what the
+    device could not accept right away. This requires a selectable file
+    descriptor and an event loop that supports watching it.
+    """
+    READ_SIZE = 4096
+
+    def __init__(self, serial, loop, on_messages):
+        self._fd = serial.fileno()
+        self._loop = loop
+        self._on_messages = on_messages
+        self._decoder = FrameDecoder()
+        self._write_buffer = bytearray()
+        self._reading = True
+        self._closed = False
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def close(self):
+        self._closed = True
+        self._stop_reading()
+
+        if self._write_buffer:
+            self._loop.remove_writer(self._fd)
+            self._write_buffer.clear()
+
+    def write(self, data):
+        """
+        Write data to the serial port.
+
+        :param data: The data to write. What can't be written immediately is
+            buffered and written as soon as the serial port is writable.
+        """
+        if not self._write_buffer:
+            try:
+                size = os.write(self._fd, data)
+            except (BlockingIOError, InterruptedError):
+                size = 0
+
+            data = data[size:]
+
+            if not data:
+                return
+
+            self._loop.add_writer(self._fd, self._on_writable)
+
+        self._write_buffer.extend(data)
+
+    def pause_reading(self):
+        """
+        Stop reading from the serial port until `resume_reading` is called.
+
+        Messages that were already read are still delivered.
+        """
+        self._stop_reading()
+
+    def resume_reading(self):
+        """
+        Resume reading from the serial port.
+        """
+        if not self._reading and not self._closed:
+            self._reading = True
+            self._loop.add_reader(self._fd, self._on_readable)
+
+    # Private methods below.
+
+    def _stop_reading(self):
+        if self._reading:
+            self._reading = False
+            self._loop.remove_reader(self._fd)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, self.READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception:
+            logger.exception(
+                "Unexpected error while reading from serial port. No longer "
+                "reading.",
+            )
+            self._closed = True
+            self._stop_reading()
+            return
+
+        if not data:
+            logger.error("Serial port was closed. No longer reading.")
+            self._closed = True
+            self._stop_reading()
+        else:
+            self._decoder.feed(data)
+            messages, _ = self._decoder.decode()
+
+            if messages:
+                self._on_messages(messages)
+
+    def _on_writable(self):
+        try:
+            size = os.write(self._fd, self._write_buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception:
+            logger.exception(
+                "Unexpected error while writing to serial port.",
+            )
+            size = len(self._write_buffer)
+
+        del self._write_buffer[:size]
+
+        if not self._write_buffer:
+            self._loop.remove_writer(self._fd)
@@ -26,6 +26,11 @@ pysteon is a library and a set of CLI that controls Insteon devices.
         'pyyaml>=3.12,<4',
         'voluptuous==0.9.3',
     ],
+    extras_require={
+        'stats': [
+            'numpy>=1.11',
+        ],
+    },
     test_suite='tests',
     classifiers=[
         'Intended Audience :: Developers',
@@ -0,0 +1,13 @@
+"""
+Shared test fixtures.
+"""
+
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
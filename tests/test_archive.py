@@ -0,0 +1,112 @@
+"""
+Tests for the events archive.
+"""
+
+import os
+import pytest
+
+from pysteon.archive import (
+    ArchiveReader,
+    ArchiveWriter,
+    read_chunk,
+)
+from pysteon.database import DatabaseEvent
+from pysteon.objects import Identity
+
+EVENTS = [
+    DatabaseEvent(
+        timestamp=1500000000.0 + index * 0.5,
+        sender=Identity(bytes([1, 2, index % 3])),
+        target=Identity(b'\x04\x05\x06'),
+        command_bytes=bytes([0x11 + index % 2 * 2, 0x01]),
+        flags_byte=0xcb,
+        hops_left=2,
+        user_data=b'',
+    )
+    for index in range(10)
+]
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_archive_writer(tmpdir, compress):
+    path = str(tmpdir.join('archive'))
+    writer = ArchiveWriter(path, chunk_size=4, compress=compress)
+    writer.append_events(EVENTS)
+
+    assert ArchiveReader(path).get_chunk_paths() == [
+        os.path.join(path, '0000000000.chunk'),
+        os.path.join(path, '0000000001.chunk'),
+    ]
+
+    writer.flush()
+    chunk_paths = ArchiveReader(path).get_chunk_paths()
+
+    assert len(chunk_paths) == 3
+
+    chunks = list(map(read_chunk, chunk_paths))
+
+    assert [len(chunk['timestamp']) for chunk in chunks] == [4, 4, 2]
+    assert list(chunks[2]['timestamp']) == [
+        1500000004000000,
+        1500000004500000,
+    ]
+    assert list(chunks[2]['sender']) == [0x010202, 0x010200]
+    assert list(chunks[2]['command']) == [0x1101, 0x1301]
+    assert list(chunks[2]['flags']) == [0xcb, 0xcb]
+
+
+def test_archive_writer_appends(tmpdir):
+    path = str(tmpdir.join('archive'))
+    ArchiveWriter(path).flush()
+    writer = ArchiveWriter(path)
+    writer.append_events(EVENTS[:1])
+    writer.flush()
+    writer = ArchiveWriter(path)
+    writer.append_events(EVENTS[1:2])
+    writer.flush()
+
+    chunk_paths = ArchiveReader(path).get_chunk_paths()
+
+    # The last partial chunk is resumed instead of starting a new one.
+    assert list(map(os.path.basename, chunk_paths)) == ['0000000000.chunk']
+    assert list(read_chunk(chunk_paths[0])['timestamp']) == [
+        1500000000000000,
+        1500000000500000,
+    ]
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_archive_writer_partial_chunk(tmpdir, compress):
+    path = str(tmpdir.join('archive'))
+    writer = ArchiveWriter(path, chunk_size=4, compress=compress)
+    reader = ArchiveReader(path)
+    counts = []
+
+    for events in (EVENTS[:1], EVENTS[1:3], EVENTS[3:6]):
+        writer.append_events(events)
+        writer.flush()
+        counts.append([
+            len(read_chunk(chunk_path)['timestamp'])
+            for chunk_path in reader.get_chunk_paths()
+        ])
+
+    assert counts == [[1], [3], [4, 2]]
+
+    writer = ArchiveWriter(path, chunk_size=4, compress=compress)
+    writer.append_events(EVENTS[6:])
+    writer.flush()
+
+    assert [
+        len(read_chunk(chunk_path)['timestamp'])
+        for chunk_path in reader.get_chunk_paths()
+    ] == [4, 4, 2]
+
+
+def test_read_chunk_invalid(tmpdir):
+    path = str(tmpdir.join('invalid.chunk'))
+
+    with open(path, 'wb') as chunk_file:
+        chunk_file.write(bytes(48))
+
+    with pytest.raises(ValueError):
+        read_chunk(path)
@@ -0,0 +1,204 @@
+"""
+Tests for the automation engine.
+"""
+
+import asyncio
+import pytest
+
+pytest.importorskip('chromalog')
+
+from pysteon.automation import Automate  # noqa
+from pysteon.database import DatabaseDevice  # noqa
+from pysteon.objects import (  # noqa
+    DeviceCategory,
+    DimmableLightingControlSubcategory,
+    Identity,
+    InsteonMessage,
+)
+
+DEVICE = DatabaseDevice(
+    identity=Identity(b'\x01\x02\x03'),
+    alias='lamp',
+    description='',
+    category=DeviceCategory.dimmable_lighting_control,
+    subcategory=list(DimmableLightingControlSubcategory)[0],
+    firmware_version=0x01,
+)
+LIGHT_ON = InsteonMessage.from_message_body(
+    b'\x01\x02\x03\x04\x05\x06\x41\x11\x01',
+)
+
+
+class MemoryDatabase(object):
+    async def get_device(self, identity):
+        if identity == DEVICE.identity:
+            return DEVICE
+
+
+@pytest.fixture
+def automate(loop):
+    return Automate(
+        plm=None,
+        database=MemoryDatabase(),
+        loop=loop,
+        callback_timeout=1.0,
+    )
+
+
+def test_handle_message_concurrent(loop, automate):
+    events = []
+
+    @automate.fire_on_light_turned_on()
+    async def slow(device, command, group):
+        events.append('slow-start')
+        await asyncio.sleep(0.05, loop=loop)
+        events.append('slow-end')
+
+    @automate.fire_on_event(commands=[0x11])
+    async def fast(device, command, group):
+        events.append('fast')
+
+    @automate.fire_on_event(commands=[0x13])
+    async def other(device, command, group):
+        events.append('other')
+
+    loop.run_until_complete(automate.handle_message(LIGHT_ON))
+
+    assert sorted(events) == ['fast', 'slow-end', 'slow-start']
+    assert events.index('fast') < events.index('slow-end')
+
+
+def test_handle_message_ordering_group(loop, automate):
+    events = []
+
+    @automate.fire_on_light_turned_on(ordering_group='lights')
+    async def first(device, command, group):
+        events.append('first-start')
+        await asyncio.sleep(0.01, loop=loop)
+        events.append('first-end')
+
+    @automate.fire_on_light_turned_on(ordering_group='lights')
+    async def second(device, command, group):
+        events.append('second')
+
+    loop.run_until_complete(automate.handle_message(LIGHT_ON))
+
+    assert events == ['first-start', 'first-end', 'second']
+
+
+def test_handle_message_failures(loop, automate):
+    events = []
+
+    @automate.fire_on_light_turned_on(timeout=0.01)
+    async def hanging(device, command, group):
+        await asyncio.sleep(1, loop=loop)
+        events.append('hanging')
+
+    @automate.fire_on_light_turned_on()
+    async def failing(device, command, group):
+        raise RuntimeError
+
+    @automate.fire_on_light_turned_on()
+    async def working(device, command, group):
+        events.append('working')
+
+    loop.run_until_complete(automate.handle_message(LIGHT_ON))
+
+    assert events == ['working']
+
+
+def test_handle_message_no_default_timeout(loop):
+    automate = Automate(plm=None, database=MemoryDatabase(), loop=loop)
+    events = []
+
+    @automate.fire_on_light_turned_on()
+    async def long(device, command, group):
+        await asyncio.sleep(0.05, loop=loop)
+        events.append('long')
+
+    loop.run_until_complete(automate.handle_message(LIGHT_ON))
+
+    assert automate.callback_timeout is None
+    assert events == ['long']
+
+
+def test_handle_message_timeout_opt_out(loop):
+    automate = Automate(
+        plm=None,
+        database=MemoryDatabase(),
+        loop=loop,
+        callback_timeout=0.01,
+    )
+    events = []
+
+    @automate.fire_on_light_turned_on(timeout=None)
+    async def long(device, command, group):
+        await asyncio.sleep(0.05, loop=loop)
+        events.append('long')
+
+    @automate.fire_on_light_turned_on()
+    async def short(device, command, group):
+        await asyncio.sleep(0.05, loop=loop)
+        events.append('short')
+
+    loop.run_until_complete(automate.handle_message(LIGHT_ON))
+
+    assert events == ['long']
+
+
+def test_transition(loop, automate):
+    events = []
+
+    @automate.fire_on_state_changed(to_states=['away'])
+    async def on_away(old_state, new_state):
+        events.append((old_state, new_state))
+
+    loop.run_until_complete(automate.transition('home'))
+    loop.run_until_complete(automate.transition('away'))
+
+    assert events == [('home', 'away')]
+
+
+def test_debounce(loop, automate):
+    calls = []
+
+    @automate.fire_on_light_turned_on()
+    @automate.debounce(0.02)
+    async def debounced(device, command, group):
+        calls.append(loop.time())
+
+    async def run():
+        start = loop.time()
+
+        for _ in range(3):
+            await automate.handle_message(LIGHT_ON)
+            await asyncio.sleep(0.01, loop=loop)
+
+        await asyncio.sleep(0.05, loop=loop)
+
+        return start
+
+    start = loop.run_until_complete(run())
+
+    assert len(calls) == 1
+    assert calls[0] - start >= 0.04
+
+
+def test_throttle(loop, automate):
+    calls = []
+
+    @automate.fire_on_light_turned_on()
+    @automate.throttle(20)
+    async def throttled(device, command, group):
+        calls.append(loop.time())
+
+    async def run():
+        for _ in range(5):
+            await automate.handle_message(LIGHT_ON)
+
+        await asyncio.sleep(0.1, loop=loop)
+
+    loop.run_until_complete(run())
+
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.045
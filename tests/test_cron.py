@@ -0,0 +1,53 @@
+"""
+Tests for the cron expressions.
+"""
+
+import pytest
+
+from datetime import datetime as dt
+
+pytest.importorskip('chromalog')
+
+from pysteon.automation.cron import (  # noqa
+    CronExpression,
+    parse_field,
+)
+
+
+def test_parse_field():
+    assert parse_field('*', 0, 5, {}) == {0, 1, 2, 3, 4, 5}
+    assert parse_field('*/2', 0, 5, {}) == {0, 2, 4}
+    assert parse_field('1-3,5', 0, 5, {}) == {1, 2, 3, 5}
+    assert parse_field('1/2', 0, 5, {}) == {1, 3, 5}
+    assert parse_field('Mon-wed', 0, 7, {'mon': 1, 'wed': 3}) == {1, 2, 3}
+
+
+@pytest.mark.parametrize('field', ['6', '3-1', '*/0', 'x'])
+def test_parse_field_invalid(field):
+    with pytest.raises(ValueError):
+        parse_field(field, 0, 5, {})
+
+
+def test_cron_expression_invalid():
+    with pytest.raises(ValueError):
+        CronExpression('* * * *')
+
+
+@pytest.mark.parametrize('expression,after,expected', [
+    ('* * * * *', dt(2017, 1, 1, 12, 0, 30), dt(2017, 1, 1, 12, 1)),
+    ('*/15 * * * *', dt(2017, 1, 1, 12, 0), dt(2017, 1, 1, 12, 15)),
+    ('30 7 * * *', dt(2017, 1, 1, 8, 0), dt(2017, 1, 2, 7, 30)),
+    ('0 0 1 * *', dt(2017, 1, 31, 0, 0), dt(2017, 2, 1, 0, 0)),
+    ('0 0 * * 7', dt(2017, 1, 2, 0, 0), dt(2017, 1, 8, 0, 0)),
+    ('0 0 * * mon-fri', dt(2017, 1, 6, 1, 0), dt(2017, 1, 9, 0, 0)),
+    ('0 0 13 * fri', dt(2017, 1, 1, 0, 0), dt(2017, 1, 6, 0, 0)),
+    ('0 0 29 feb *', dt(2017, 1, 1, 0, 0), dt(2020, 2, 29, 0, 0)),
+    ('0 12 * dec *', dt(2017, 12, 31, 12, 0), dt(2018, 12, 1, 12)),
+])
+def test_cron_expression_get_next(expression, after, expected):
+    assert CronExpression(expression).get_next(after) == expected
+
+
+def test_cron_expression_never_matches():
+    with pytest.raises(ValueError):
+        CronExpression('0 0 31 feb *').get_next(dt(2017, 1, 1))
@@ -2,12 +2,18 @@
 Database tests.
 """
 
+import pytest
+import sqlite3
+
 from pysteon.database import (
+    AsyncDatabase,
     Database,
     DatabaseDevice,
+    DatabaseEvent,
 )
 from pysteon.objects import (
     Identity,
+    InsteonMessage,
     GenericDeviceCategory,
     GenericSubcategory,
 )
@@ -72,3 +78,324 @@ def test_set_existing_device():
     )
     database.set_device(*database_device2)
     assert database.get_device(identity) == database_device2
+
+
+def test_transaction():
+    database = Database.load_from_file(':memory:')
+    identity = Identity(b'\x01\x02\x03')
+
+    with database.transaction():
+        database.set_device(
+            identity=identity,
+            alias='foo',
+            description='',
+            category=GenericDeviceCategory(0x42),
+            subcategory=GenericSubcategory(0x80),
+            firmware_version=0x99,
+        )
+
+    assert database.get_device(identity).alias == 'foo'
+
+
+def test_transaction_rollback():
+    database = Database.load_from_file(':memory:')
+    identity = Identity(b'\x01\x02\x03')
+
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.set_device(
+                identity=identity,
+                alias='foo',
+                description='',
+                category=GenericDeviceCategory(0x42),
+                subcategory=GenericSubcategory(0x80),
+                firmware_version=0x99,
+            )
+
+            raise RuntimeError
+
+    assert database.get_device(identity) is None
+
+
+def test_get_device_cache():
+    database = Database.load_from_file(':memory:')
+    identity = Identity(b'\x01\x02\x03')
+    database.set_device(
+        identity=identity,
+        alias='foo',
+        description='',
+        category=GenericDeviceCategory(0x42),
+        subcategory=GenericSubcategory(0x80),
+        firmware_version=0x99,
+    )
+
+    device = database.get_device(identity)
+    assert database.get_device(identity) is device
+    assert (database.cache_hits, database.cache_misses) == (1, 1)
+
+    database.set_device(*device._replace(alias='bar'))
+    assert database.get_device(identity).alias == 'bar'
+    assert (database.cache_hits, database.cache_misses) == (1, 2)
+
+
+def test_get_device_negative_cache():
+    database = Database.load_from_file(':memory:')
+    identity = Identity(b'\x01\x02\x03')
+
+    assert database.get_device(identity) is None
+    assert database.get_device(identity) is None
+    assert (database.cache_hits, database.cache_misses) == (1, 1)
+
+    database.set_device(
+        identity=identity,
+        alias='foo',
+        description='',
+        category=GenericDeviceCategory(0x42),
+        subcategory=GenericSubcategory(0x80),
+        firmware_version=0x99,
+    )
+    assert database.get_device(identity).alias == 'foo'
+
+
+def test_get_device_cache_eviction():
+    database = Database.load_from_file(':memory:', cache_size=2)
+
+    for index in range(3):
+        database.get_device(Identity(bytes([1, 2, index])))
+
+    database.get_device(Identity(b'\x01\x02\x00'))
+    database.get_device(Identity(b'\x01\x02\x02'))
+    assert (database.cache_hits, database.cache_misses) == (1, 4)
+
+
+def test_get_device_without_negative_cache():
+    database = Database.load_from_file(':memory:', negative_cache_ttl=None)
+    identity = Identity(b'\x01\x02\x03')
+
+    assert database.get_device(identity) is None
+    assert database.get_device(identity) is None
+    assert (database.cache_hits, database.cache_misses) == (0, 2)
+
+
+def test_set_devices():
+    database = Database.load_from_file(':memory:')
+    database_devices = [
+        DatabaseDevice(
+            identity=Identity(bytes([1, 2, index])),
+            alias='foo%d' % index,
+            description='',
+            category=GenericDeviceCategory(0x42),
+            subcategory=GenericSubcategory(0x80),
+            firmware_version=0x99,
+        )
+        for index in range(3)
+    ]
+
+    assert database.set_devices(iter(database_devices)) == database_devices
+    assert database.get_devices() == {
+        database_device.identity: database_device
+        for database_device in database_devices
+    }
+
+
+def test_set_device_duplicate_alias():
+    database = Database.load_from_file(':memory:')
+    database.set_device(
+        identity=Identity(b'\x01\x02\x03'),
+        alias='foo',
+        description='',
+        category=GenericDeviceCategory(0x42),
+        subcategory=GenericSubcategory(0x80),
+        firmware_version=0x99,
+    )
+
+    with pytest.raises(sqlite3.IntegrityError):
+        database.set_device(
+            identity=Identity(b'\x01\x02\x04'),
+            alias='foo',
+            description='',
+            category=GenericDeviceCategory(0x42),
+            subcategory=GenericSubcategory(0x80),
+            firmware_version=0x99,
+        )
+
+    assert database.get_device_by_alias('foo').identity == \
+        Identity(b'\x01\x02\x03')
+
+
+def test_migrate_text_identities(tmpdir):
+    path = str(tmpdir.join('database.sqlite'))
+    db = sqlite3.connect(path)
+    db.execute(
+        'CREATE TABLE devices (identity TEXT, alias TEXT, description TEXT, '
+        'category INTEGER, subcategory INTEGER, firmware_version INTEGER, '
+        'UNIQUE(identity))',
+    )
+    db.executemany(
+        'INSERT INTO devices VALUES (?, ?, ?, ?, ?, ?)',
+        [
+            ('01.02.03', 'foo', 'First', 0x42, 0x80, 0x99),
+            ('01.02.04', None, None, 0x42, 0x80, 0x99),
+            ('01.02.05', 'foo', 'Second', 0x42, 0x80, 0x99),
+        ],
+    )
+    db.commit()
+    db.close()
+
+    database = Database.load_from_file(path)
+
+    assert database.get_device(Identity(b'\x01\x02\x03')).alias is None
+    assert database.get_device(Identity(b'\x01\x02\x04')).alias is None
+    assert database.get_device_by_alias('foo') == DatabaseDevice(
+        identity=Identity(b'\x01\x02\x05'),
+        alias='foo',
+        description='Second',
+        category=GenericDeviceCategory(0x42),
+        subcategory=GenericSubcategory(0x80),
+        firmware_version=0x99,
+    )
+    database.close()
+
+    # Loading an up-to-date database leaves it untouched.
+    database = Database.load_from_file(path)
+    version, = database._db.execute('PRAGMA user_version').fetchone()
+
+    assert version == len(Database.MIGRATIONS)
+    assert len(database.get_devices()) == 3
+
+
+def test_migrate_failure_is_atomic(tmpdir):
+    path = str(tmpdir.join('database.sqlite'))
+    db = sqlite3.connect(path)
+    db.execute(
+        'CREATE TABLE devices (identity TEXT, alias TEXT, description TEXT, '
+        'category INTEGER, subcategory INTEGER, firmware_version INTEGER, '
+        'UNIQUE(identity))',
+    )
+    db.executemany(
+        'INSERT INTO devices VALUES (?, ?, ?, ?, ?, ?)',
+        [
+            ('01.02.03', 'foo', 'First', 0x42, 0x80, 0x99),
+            ('invalid', None, None, 0x42, 0x80, 0x99),
+        ],
+    )
+    db.commit()
+    db.close()
+
+    # Failing again proves that the first attempt left nothing behind.
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            Database.load_from_file(path)
+
+    db = sqlite3.connect(path)
+    tables = [
+        name for name, in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'",
+        )
+    ]
+    version, = db.execute('PRAGMA user_version').fetchone()
+    rows = db.execute('SELECT identity FROM devices').fetchall()
+    db.close()
+
+    assert tables == ['devices']
+    assert version == 0
+    assert rows == [('01.02.03',), ('invalid',)]
+
+
+@pytest.fixture(params=['file', ':memory:'])
+def async_database(request, tmpdir, loop):
+    if request.param == 'file':
+        path = str(tmpdir.join('database.sqlite'))
+    else:
+        path = request.param
+
+    database = AsyncDatabase(path, loop=loop)
+
+    yield database
+
+    database.close()
+
+
+def test_async_database(async_database):
+    loop = async_database.loop
+    identity = Identity(b'\x01\x02\x03')
+    database_device = DatabaseDevice(
+        identity=identity,
+        alias='foo',
+        description='',
+        category=GenericDeviceCategory(0x42),
+        subcategory=GenericSubcategory(0x80),
+        firmware_version=0x99,
+    )
+
+    assert loop.run_until_complete(async_database.get_device(identity)) is None
+    loop.run_until_complete(async_database.set_device(*database_device))
+
+    assert loop.run_until_complete(
+        async_database.get_device(identity),
+    ) == database_device
+    assert loop.run_until_complete(
+        async_database.get_device(identity),
+    ) == database_device
+    assert loop.run_until_complete(
+        async_database.get_device_by_alias('foo'),
+    ) == database_device
+    assert loop.run_until_complete(async_database.get_devices()) == {
+        identity: database_device,
+    }
+    assert (async_database.cache.hits, async_database.cache.misses) == (1, 2)
+
+
+def test_async_database_write(async_database):
+    loop = async_database.loop
+    identity = Identity(b'\x01\x02\x03')
+
+    def set_description(database, description):
+        database.set_device(
+            identity=identity,
+            alias=None,
+            description=description,
+            category=GenericDeviceCategory(0x42),
+            subcategory=GenericSubcategory(0x80),
+            firmware_version=0x99,
+        )
+
+        raise RuntimeError
+
+    loop.run_until_complete(async_database.get_device(identity))
+
+    with pytest.raises(RuntimeError):
+        loop.run_until_complete(
+            async_database.write(set_description, 'foo'),
+        )
+
+    assert loop.run_until_complete(async_database.get_device(identity)) is None
+    assert async_database.cache.misses == 2
+
+
+def test_events():
+    database = Database.load_from_file(':memory:')
+    events = [
+        DatabaseEvent.from_insteon_message(
+            timestamp=timestamp,
+            insteon_message=InsteonMessage.from_message_body(body),
+        )
+        for timestamp, body in [
+            (10.0, b'\x01\x02\x03\x04\x05\x06\x4b\x11\x01'),
+            (20.0, b'\x01\x02\x04\x04\x05\x06\x4b\x13\x01'),
+            (30.0, b'\x01\x02\x03\x04\x05\x06\x1f\x2e\x00' + bytes(14)),
+        ]
+    ]
+    database.add_events(events)
+
+    assert events[0].hops_left == 2
+    assert database.get_events() == events
+    assert database.get_events(since=20.0) == events[1:]
+    assert database.get_events(until=20.0) == events[:1]
+    assert database.get_events(sender=Identity(b'\x01\x02\x03')) == [
+        events[0],
+        events[2],
+    ]
+
+    assert database.prune_events(before=25.0) == 2
+    assert database.get_events() == events[2:]
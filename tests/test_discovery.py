@@ -0,0 +1,95 @@
+"""
+Tests for the devices discovery.
+"""
+
+import asyncio
+import pytest
+
+from pysteon.discovery import DeviceDiscovery
+from pysteon.exceptions import (
+    CommandFailure,
+    CommandTimeout,
+    TransmissionFailure,
+)
+from pysteon.messaging import CommandCode
+from pysteon.objects import Identity
+
+SEND = CommandCode.send_standard_or_extended_message
+FIRST = Identity(b'\x01\x02\x03')
+SECOND = Identity(b'\x04\x05\x06')
+THIRD = Identity(b'\x07\x08\x09')
+
+
+class StubPLM(object):
+    """
+    Answers ID requests with scripted outcomes: an exception to raise, or
+    the delay before answering.
+    """
+
+    def __init__(self, loop, outcomes):
+        self.loop = loop
+        self.outcomes = outcomes
+        self.requests = []
+
+    async def id_request(self, identity, timeout):
+        self.requests.append((identity, self.loop.time()))
+        outcome = self.outcomes[identity].pop(0)
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        await asyncio.sleep(outcome, loop=self.loop)
+
+        return 'info-%s' % identity
+
+
+def test_discover_failures(loop):
+    plm = StubPLM(loop=loop, outcomes={
+        FIRST: [CommandFailure(SEND), 0],
+        SECOND: [TransmissionFailure(SEND, attempts=3)] * 3,
+        THIRD: [CommandTimeout('id_request', 0.1), 0],
+    })
+    discovery = DeviceDiscovery(plm=plm, backoff=0.01, retries=2)
+    on_result = []
+    results = loop.run_until_complete(
+        discovery.discover([FIRST, SECOND, THIRD], on_result.append),
+    )
+    results = {result.identity: result for result in results}
+
+    assert len(on_result) == 3
+    assert results[FIRST].device_info == 'info-%s' % FIRST
+    assert results[FIRST].attempts == 2
+    assert not results[SECOND].success
+    assert results[SECOND].attempts == 3
+    assert results[THIRD].success
+    assert results[THIRD].attempts == 2
+
+
+def test_discover_backoff(loop):
+    plm = StubPLM(loop=loop, outcomes={
+        FIRST: [CommandTimeout('id_request', 0.1)] * 2 + [0],
+    })
+    discovery = DeviceDiscovery(plm=plm, backoff=0.02, retries=2)
+    results = loop.run_until_complete(discovery.discover([FIRST]))
+    times = [time for _, time in plm.requests]
+
+    assert results[0].attempts == 3
+    assert times[1] - times[0] >= 0.02
+    assert times[2] - times[1] >= 0.04
+    assert results[0].latency >= 0.06
+
+
+def test_discover_latency_excludes_queueing(loop):
+    plm = StubPLM(loop=loop, outcomes={
+        FIRST: [0.05],
+        SECOND: [0.05],
+        THIRD: [0.05],
+    })
+    discovery = DeviceDiscovery(plm=plm, concurrency=1)
+    results = loop.run_until_complete(
+        discovery.discover([FIRST, SECOND, THIRD]),
+    )
+
+    assert len(results) == 3
+    assert all(0.05 <= result.latency < 0.09 for result in results)
+    assert plm.requests[2][1] - plm.requests[0][1] >= 0.1
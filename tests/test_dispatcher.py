@@ -0,0 +1,287 @@
+"""
+Tests for the message dispatcher.
+"""
+
+import asyncio
+import pytest
+
+from pysteon.dispatcher import (
+    DuplicateFilter,
+    MessageDispatcher,
+    OverflowPolicy,
+    ReplyCorrelator,
+    SubscriberQueue,
+)
+from pysteon.messaging import (
+    CommandCode,
+    IncomingMessage,
+    MessageFailure,
+)
+from pysteon.objects import (
+    Identity,
+    InsteonMessage,
+    InsteonMessageFlag,
+)
+
+STANDARD_MESSAGE = IncomingMessage(
+    command_code=CommandCode.standard_message_received,
+    body=b'\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b',
+)
+BUTTON_EVENT_REPORT = IncomingMessage(
+    command_code=CommandCode.button_event_report,
+    body=b'\x03',
+)
+FAILURE = MessageFailure('failure')
+
+
+def test_dispatch_all():
+    dispatcher = MessageDispatcher()
+    messages = []
+    dispatcher.subscribe(messages.append)
+
+    dispatcher.dispatch(STANDARD_MESSAGE)
+    dispatcher.dispatch(FAILURE)
+
+    assert messages == [STANDARD_MESSAGE, FAILURE]
+
+
+def test_dispatch_command_codes():
+    dispatcher = MessageDispatcher()
+    messages = []
+    dispatcher.subscribe(
+        messages.append,
+        command_codes=[CommandCode.button_event_report],
+    )
+
+    dispatcher.dispatch(STANDARD_MESSAGE)
+    dispatcher.dispatch(BUTTON_EVENT_REPORT)
+    dispatcher.dispatch(FAILURE)
+
+    assert messages == [BUTTON_EVENT_REPORT]
+
+
+def test_dispatch_failures():
+    dispatcher = MessageDispatcher()
+    messages = []
+    dispatcher.subscribe(
+        messages.append,
+        command_codes=[CommandCode.button_event_report],
+        handle_failures=True,
+    )
+
+    dispatcher.dispatch(STANDARD_MESSAGE)
+    dispatcher.dispatch(FAILURE)
+
+    assert messages == [FAILURE]
+
+
+def test_dispatch_senders():
+    dispatcher = MessageDispatcher()
+    messages = []
+    other_messages = []
+    dispatcher.subscribe(messages.append, senders=[b'\x0a\x0b\x0c'])
+    dispatcher.subscribe(other_messages.append, senders=[b'\x0a\x0b\x0d'])
+
+    dispatcher.dispatch(STANDARD_MESSAGE)
+    dispatcher.dispatch(BUTTON_EVENT_REPORT)
+
+    assert messages == [STANDARD_MESSAGE]
+    assert other_messages == []
+
+
+def test_unsubscribe():
+    dispatcher = MessageDispatcher()
+    messages = []
+    subscription = dispatcher.subscribe(messages.append)
+    sender_subscription = dispatcher.subscribe(
+        messages.append,
+        senders=[b'\x0a\x0b\x0c'],
+    )
+    dispatcher.unsubscribe(subscription)
+    dispatcher.unsubscribe(sender_subscription)
+
+    dispatcher.dispatch(STANDARD_MESSAGE)
+
+    assert messages == []
+
+
+def test_correlator_resolve(loop):
+    correlator = ReplyCorrelator()
+    ack = asyncio.Future(loop=loop)
+    reply = asyncio.Future(loop=loop)
+    correlator.expect(
+        ack,
+        sender=Identity(b'\x0a\x0b\x0c'),
+        command=0x2e,
+        flags={InsteonMessageFlag.ack},
+    )
+    correlator.expect(
+        reply,
+        sender=Identity(b'\x0a\x0b\x0c'),
+        command=0x2e,
+        flags={InsteonMessageFlag.extended},
+        not_flags={InsteonMessageFlag.ack},
+    )
+    reply_message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\x1b\x2e\x00' + bytes(14),
+    )
+    ack_message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\x2b\x2e\x00',
+    )
+    other_message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0d\x01\x02\x03\x2b\x2e\x00',
+    )
+
+    assert not correlator.resolve(other_message)
+    assert correlator.resolve(reply_message)
+    assert correlator.resolve(ack_message)
+    assert not correlator.resolve(ack_message)
+    assert ack.result() is ack_message
+    assert reply.result() is reply_message
+
+
+def test_correlator_any_command(loop):
+    correlator = ReplyCorrelator()
+    reply = asyncio.Future(loop=loop)
+    correlator.expect(
+        reply,
+        sender=Identity(b'\x0a\x0b\x0c'),
+        flags={InsteonMessageFlag.broadcast},
+    )
+    message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x20\x41\x8b\x01\x00',
+    )
+
+    assert correlator.resolve(message)
+    assert reply.result() is message
+
+
+def test_correlator_discard(loop):
+    correlator = ReplyCorrelator()
+    reply = asyncio.Future(loop=loop)
+    expectation = correlator.expect(reply, sender=Identity(b'\x0a\x0b\x0c'))
+    correlator.discard(expectation)
+    correlator.discard(expectation)
+    message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x20\x41\x8b\x01\x00',
+    )
+
+    assert not correlator.resolve(message)
+    assert not reply.done()
+
+
+def test_subscriber_queue_unbounded():
+    queue = SubscriberQueue()
+
+    for index in range(100):
+        queue.put_nowait(index)
+
+    assert queue.qsize() == 100
+    assert queue.high_water_mark == 100
+    assert queue.dropped == 0
+
+
+def test_subscriber_queue_drop_newest():
+    queue = SubscriberQueue(maxsize=2, overflow=OverflowPolicy.drop_newest)
+
+    for index in range(5):
+        queue.put_nowait(index)
+
+    assert [queue.get_nowait() for _ in range(queue.qsize())] == [0, 1]
+    assert queue.high_water_mark == 2
+    assert queue.dropped == 3
+
+
+def test_subscriber_queue_drop_oldest():
+    queue = SubscriberQueue(maxsize=2, overflow=OverflowPolicy.drop_oldest)
+
+    for index in range(5):
+        queue.put_nowait(index)
+
+    assert [queue.get_nowait() for _ in range(queue.qsize())] == [3, 4]
+    assert queue.high_water_mark == 2
+    assert queue.dropped == 3
+
+
+def test_subscriber_queue_block():
+    events = []
+    queue = SubscriberQueue(
+        maxsize=4,
+        on_pause=lambda: events.append('pause'),
+        on_resume=lambda: events.append('resume'),
+    )
+
+    for index in range(6):
+        queue.put_nowait(index)
+
+    assert events == ['pause']
+    assert queue.qsize() == 6
+    assert queue.high_water_mark == 6
+    assert queue.dropped == 0
+
+    for index in range(3):
+        assert queue.get_nowait() == index
+
+    assert events == ['pause']
+    assert queue.get_nowait() == 3
+    assert events == ['pause', 'resume']
+
+
+def test_subscriber_queue_close_resumes():
+    events = []
+    queue = SubscriberQueue(
+        maxsize=1,
+        on_pause=lambda: events.append('pause'),
+        on_resume=lambda: events.append('resume'),
+    )
+    queue.put_nowait(0)
+    queue.close()
+
+    assert events == []
+
+    queue.put_nowait(1)
+    queue.close()
+
+    assert events == ['pause', 'resume']
+
+
+def test_duplicate_filter():
+    duplicate_filter = DuplicateFilter(window=0.5)
+    message = InsteonMessage.from_message_body(STANDARD_MESSAGE.body)
+    repeated_message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\xe2\x0a\x0b',
+    )
+    other_message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0c',
+    )
+
+    assert not duplicate_filter.is_duplicate(message, now=10.0)
+    assert duplicate_filter.is_duplicate(repeated_message, now=10.1)
+    assert not duplicate_filter.is_duplicate(other_message, now=10.2)
+
+    # A device toggled back is not a repeat.
+    assert not duplicate_filter.is_duplicate(message, now=10.3)
+    assert duplicate_filter.is_duplicate(repeated_message, now=10.4)
+    assert duplicate_filter.is_duplicate(message, now=10.7)
+    assert duplicate_filter.suppressed == 3
+
+    # The window starts with the original message.
+    assert not duplicate_filter.is_duplicate(message, now=10.8)
+
+
+def test_duplicate_filter_expiry():
+    duplicate_filter = DuplicateFilter(window=0.5)
+    messages = [
+        InsteonMessage.from_message_body(
+            bytes([0x0a, 0x0b, index]) + b'\x01\x02\x03\xe2\x0a\x0b',
+        )
+        for index in range(3)
+    ]
+
+    for index, message in enumerate(messages):
+        assert not duplicate_filter.is_duplicate(message, now=10.0 + index)
+
+    # Only the messages of the last window are remembered.
+    assert len(duplicate_filter._last_messages) == 1
+    assert duplicate_filter.is_duplicate(messages[2], now=12.1)
+    assert not duplicate_filter.is_duplicate(messages[1], now=12.2)
@@ -2,6 +2,50 @@
 Tests for the entry points.
 """
 
+import pytest
+
+pytest.importorskip('chromalog')
+pytest.importorskip('serial')
+
+from click import ClickException  # noqa
+
+from pysteon.database import Database  # noqa
+from pysteon.entry_points import pysteon  # noqa
+from pysteon.objects import (  # noqa
+    GenericDeviceCategory,
+    GenericSubcategory,
+    Identity,
+)
+
 
 def test_dummy():
     pass
+
+
+def test_db_alias_in_use(tmpdir):
+    root = str(tmpdir)
+    database = Database.load_from_file(str(tmpdir.join('database.sqlite')))
+
+    for identity, alias in [('01.02.03', 'foo'), ('01.02.04', 'bar')]:
+        database.set_device(
+            identity=Identity.from_string(identity),
+            alias=alias,
+            description=None,
+            category=GenericDeviceCategory(0x42),
+            subcategory=GenericSubcategory(0x80),
+            firmware_version=0x41,
+        )
+
+    database.close()
+
+    # Invoke the command directly, as `main` refuses to run on ASCII locales.
+    ctx = pysteon.make_context(
+        'pysteon',
+        ['--root', root, 'db', '01.02.04', '--alias', 'foo'],
+    )
+
+    with pytest.raises(ClickException) as error:
+        with ctx:
+            pysteon.invoke(ctx)
+
+    assert error.value.message == "The alias foo is already used by 01.02.03."
@@ -0,0 +1,159 @@
+"""
+Tests for the events history.
+"""
+
+import asyncio
+import pytest
+import time
+
+from threading import Lock
+
+from pysteon.history import EventRecorder
+from pysteon.objects import InsteonMessage
+
+
+def make_message(index):
+    return InsteonMessage.from_message_body(
+        b'\x01\x02\x03\x04\x05\x06\x0b\x11' + bytes([index]),
+    )
+
+
+class MemoryDatabase(object):
+    """
+    Stores the events in memory, optionally taking some time to write them.
+    """
+
+    def __init__(self, loop, delay=0):
+        self.loop = loop
+        self.delay = delay
+        self.events = []
+        self.prunes = []
+
+    async def add_events(self, events):
+        await asyncio.sleep(self.delay, loop=self.loop)
+        self.events.extend(events)
+
+    async def prune_events(self, before):
+        self.prunes.append(before)
+
+        return 0
+
+
+class MemoryArchive(object):
+    def __init__(self):
+        self.events = []
+        self.flushes = 0
+        self._lock = Lock()
+
+    def append_events(self, events):
+        with self._lock:
+            self.events.extend(events)
+
+    def flush(self):
+        with self._lock:
+            self.flushes += 1
+
+
+def run(loop, coroutine):
+    return loop.run_until_complete(asyncio.wait_for(coroutine, 5, loop=loop))
+
+
+def test_recorder_batch_size(loop):
+    database = MemoryDatabase(loop=loop)
+
+    async def record():
+        async with EventRecorder(
+            database,
+            batch_size=3,
+            flush_interval=60,
+        ) as recorder:
+            for index in range(3):
+                recorder.record(make_message(index))
+
+            await asyncio.sleep(0.01, loop=loop)
+
+            return len(database.events)
+
+    assert run(loop, record()) == 3
+
+
+def test_recorder_flush_interval(loop):
+    database = MemoryDatabase(loop=loop)
+
+    async def record():
+        async with EventRecorder(
+            database,
+            batch_size=100,
+            flush_interval=0.02,
+        ) as recorder:
+            recorder.record(make_message(0))
+            await asyncio.sleep(0.01, loop=loop)
+            count = len(database.events)
+            await asyncio.sleep(0.03, loop=loop)
+
+            return count, len(database.events)
+
+    assert run(loop, record()) == (0, 1)
+
+
+def test_recorder_max_pending(loop):
+    database = MemoryDatabase(loop=loop)
+    recorder = EventRecorder(database, max_pending=2)
+
+    for index in range(3):
+        recorder.record(make_message(index))
+
+    run(loop, recorder.flush())
+
+    assert recorder.dropped == 1
+    assert recorder.recorded == 2
+    assert [
+        event.command_bytes for event in database.events
+    ] == [b'\x11\x01', b'\x11\x02']
+
+
+def test_recorder_retention(loop):
+    database = MemoryDatabase(loop=loop)
+
+    async def record():
+        async with EventRecorder(
+            database,
+            flush_interval=0.01,
+            retention=3600,
+            prune_interval=60,
+        ):
+            await asyncio.sleep(0.05, loop=loop)
+
+    start = time.time()
+    run(loop, record())
+
+    # Pruned once, when the task started.
+    assert len(database.prunes) == 1
+    assert start - 3600 <= database.prunes[0] <= time.time() - 3600
+
+
+def test_recorder_exit_during_write(loop):
+    database = MemoryDatabase(loop=loop, delay=0.05)
+    archive = MemoryArchive()
+
+    async def record():
+        async with EventRecorder(
+            database,
+            batch_size=1,
+            flush_interval=60,
+            archive=archive,
+        ) as recorder:
+            recorder.record(make_message(0))
+
+            # Exit while the first event is being written.
+            await asyncio.sleep(0.01, loop=loop)
+            recorder.record(make_message(1))
+
+        return recorder
+
+    recorder = run(loop, record())
+
+    assert recorder.recorded == 2
+    assert len(database.events) == 2
+    assert len(archive.events) == 2
+    assert archive.flushes == 1
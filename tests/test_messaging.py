@@ -4,8 +4,12 @@ Tests for the messaging functions.
 
 
 from pysteon.messaging import (
+    BODY_SIZES,
     CommandCode,
+    FRAME_SPECS,
+    FrameDecoder,
     IncomingMessage,
+    MessageFailure,
     parse_message,
     parse_messages,
 )
@@ -92,3 +96,103 @@ def test_parse_message_standard_message_received_null_padding():
 
 def test_parse_message_invalid():
     assert parse_message(bytearray(b'\x01\x03')) == (None, 2)
+
+
+def test_frame_decoder_decode():
+    decoder = FrameDecoder()
+    decoder.feed(
+        b'\x00\x00\x02\x50\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b'
+        b'\x15'
+        b'\x02\x51\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b'
+        b'\x01\x02\x03\x04\x05\x06\x07'
+        b'\x01\x02\x03\x04\x05\x06\x07'
+    )
+    messages, expected = decoder.decode()
+
+    assert len(messages) == 3
+    assert messages[0] == IncomingMessage(
+        command_code=CommandCode.standard_message_received,
+        body=b'\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b',
+    )
+    assert isinstance(messages[1], MessageFailure)
+    assert messages[2].command_code == CommandCode.extended_message_received
+    assert len(messages[2].body) == 23
+    assert expected == 2
+    assert len(decoder) == 0
+
+
+def test_frame_decoder_bodies_are_not_copied():
+    decoder = FrameDecoder()
+    decoder.feed(b'\x02\x50\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b')
+    messages, _ = decoder.decode()
+
+    assert isinstance(messages[0].body, memoryview)
+
+
+def test_frame_decoder_partial_message():
+    decoder = FrameDecoder()
+    decoder.feed(b'\x02\x50\x0a\x0b\x0c')
+
+    assert decoder.decode() == ([], 6)
+    assert len(decoder) == 5
+
+    decoder.feed(b'\x01\x02\x03\xe0\x0a\x0b\x02')
+    messages, expected = decoder.decode()
+
+    assert messages == [
+        IncomingMessage(
+            command_code=CommandCode.standard_message_received,
+            body=b'\x0a\x0b\x0c\x01\x02\x03\xe0\x0a\x0b',
+        ),
+    ]
+    assert expected == 1
+    assert len(decoder) == 1
+
+
+def test_frame_decoder_unknown_command_code():
+    decoder = FrameDecoder()
+    decoder.feed(b'\x02\x00\x02\x54\x03')
+    messages, expected = decoder.decode()
+
+    assert messages == [
+        IncomingMessage(
+            command_code=CommandCode.button_event_report,
+            body=b'\x03',
+        ),
+    ]
+    assert expected == 2
+
+
+def test_frame_decoder_extended_echo():
+    decoder = FrameDecoder()
+    decoder.feed(b'\x02\x62\x01\x02\x03\x1f\x2e\x00')
+
+    assert decoder.decode() == ([], 15)
+
+
+def test_frame_specs():
+    assert len(FRAME_SPECS) == 256
+
+    for code, frame_spec in enumerate(FRAME_SPECS):
+        if frame_spec is None:
+            assert code not in BODY_SIZES
+        else:
+            assert frame_spec.command_code == code
+            assert frame_spec.command_code is CommandCode(code)
+            assert frame_spec.body_size == BODY_SIZES[code]
+
+    assert FRAME_SPECS[
+        CommandCode.send_standard_or_extended_message
+    ].extensible
+    assert not FRAME_SPECS[CommandCode.standard_message_received].extensible
+
+
+def test_frame_decoder_unsupported_command_code():
+    decoder = FrameDecoder()
+    decoder.feed(b'\x02\x61\x02\x55')
+    messages, expected = decoder.decode()
+
+    assert messages == [
+        IncomingMessage(command_code=CommandCode.user_reset_detected),
+    ]
+    assert expected == 2
@@ -11,6 +11,8 @@ from pysteon.objects import (
     GenericDeviceCategory,
     GenericSubcategory,
     Identity,
+    InsteonMessage,
+    InsteonMessageFlag,
     parse_device_categories,
 )
 
@@ -119,3 +121,66 @@ def test_all_link_mode_to_string():
     assert str(AllLinkMode.controller) == "controller"
     assert str(AllLinkMode.delete) == "delete"
     assert str(AllLinkMode.responder) == "responder"
+
+
+def test_insteon_message_from_message_body():
+    message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\x2b\x11\xff',
+    )
+
+    assert message.sender == Identity(b'\x0a\x0b\x0c')
+    assert message.target == Identity(b'\x01\x02\x03')
+    assert message.hops_left == 2
+    assert message.max_hops == 3
+    assert message.flags == {InsteonMessageFlag.ack}
+    assert message.is_ack
+    assert not message.is_extended
+    assert not message.is_broadcast
+    assert not message.is_all_link
+    assert message.command_bytes == b'\x11\xff'
+    assert message.user_data == b''
+
+
+def test_insteon_message_to_message_body():
+    message = InsteonMessage(
+        sender=Identity(b'\x0a\x0b\x0c'),
+        target=Identity(b'\x01\x02\x03'),
+        hops_left=2,
+        max_hops=3,
+        flags={InsteonMessageFlag.extended},
+        command_bytes=b'\x2e\x00',
+        user_data=bytes(14),
+    )
+
+    assert message.flags_byte == 0x1b
+    assert message.is_extended
+    assert message.to_message_body() == \
+        b'\x01\x02\x03\x1b\x2e\x00' + bytes(14)
+
+
+def test_insteon_message_equality():
+    body = b'\x0a\x0b\x0c\x01\x02\x03\x8b\x01\x00'
+    message = InsteonMessage(
+        sender=Identity(b'\x0a\x0b\x0c'),
+        target=Identity(b'\x01\x02\x03'),
+        hops_left=2,
+        max_hops=3,
+        flags={InsteonMessageFlag.broadcast},
+        command_bytes=b'\x01\x00',
+        user_data=b'',
+    )
+
+    assert InsteonMessage.from_message_body(body) == message
+    assert InsteonMessage.from_message_body(memoryview(body)) == message
+
+
+def test_insteon_message_is_immutable():
+    message = InsteonMessage.from_message_body(
+        b'\x0a\x0b\x0c\x01\x02\x03\x2b\x11\xff',
+    )
+
+    with pytest.raises(AttributeError):
+        message.sender = Identity(b'\x01\x02\x03')
+
+    with pytest.raises(AttributeError):
+        message.foo = 42
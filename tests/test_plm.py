@@ -0,0 +1,345 @@
+"""
+Tests for the PowerLine Modem.
+"""
+
+import asyncio
+import os
+import pytest
+import threading
+import time
+import tty
+
+pytest.importorskip('serial')
+
+from pysteon.exceptions import CommandTimeout  # noqa
+from pysteon.messaging import CommandCode  # noqa
+from pysteon.objects import Identity  # noqa
+from pysteon.plm import PowerLineModem  # noqa
+from pysteon.retry import RetryPolicy  # noqa
+
+PLM_IDENTITY = b'\x44\x85\x11'
+DEVICE_IDENTITY = b'\x11\x22\x33'
+OTHER_DEVICE_IDENTITY = b'\x11\x22\x34'
+
+
+def make_received_message(
+    command=b'\x11\x01',
+    flags=b'\x0b',
+    sender=DEVICE_IDENTITY,
+):
+    return b'\x02\x50' + sender + PLM_IDENTITY + flags + command
+
+
+class FakeModem(object):
+    """
+    A PLM simulated on the master side of a pseudo-terminal.
+
+    Commands are answered with an ACK, unless a handler is registered for
+    their command code in `handlers`, in which case it returns the bytes to
+    answer. The next `naks` commands are answered with a standalone NAK.
+    """
+
+    # The body size of the commands sent by the tests.
+    BODY_SIZES = {
+        CommandCode.get_im_info: 0,
+        CommandCode.send_standard_or_extended_message: 6,
+    }
+
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.handlers = {}
+        self.naks = 0
+        self.received = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, data):
+        os.write(self.master, data)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    # Private methods below.
+
+    def _run(self):
+        buffer = b''
+
+        while True:
+            try:
+                buffer += os.read(self.master, 1024)
+            except OSError:
+                return
+
+            while len(buffer) >= 2:
+                command_code = buffer[1]
+                size = 2 + self.BODY_SIZES.get(command_code, 0)
+
+                if len(buffer) < size:
+                    break
+
+                frame, buffer = buffer[:size], buffer[size:]
+                self.received.append(frame)
+
+                if self.naks:
+                    self.naks -= 1
+                    self.send(b'\x15')
+                elif command_code == CommandCode.get_im_info:
+                    self.send(frame + PLM_IDENTITY + b'\x03\x15\x9b\x06')
+                elif command_code in self.handlers:
+                    self.send(self.handlers[command_code](frame))
+                else:
+                    self.send(frame + b'\x06')
+
+
+@pytest.fixture
+def modem():
+    modem = FakeModem()
+    yield modem
+    modem.close()
+
+
+@pytest.fixture
+def plm(loop, modem):
+    plm = PowerLineModem(modem.path, loop=loop)
+    yield plm
+    plm.close()
+
+
+def test_emit_messages_isolates_failures(loop, modem, plm):
+    emitted = []
+
+    def on_message(message):
+        emitted.append(message)
+
+        if len(emitted) == 1:
+            raise RuntimeError
+
+    plm.on_message.connect(on_message)
+
+    async def read():
+        with plm.read(
+            command_codes=[CommandCode.standard_message_received],
+        ) as queue:
+            # Both messages are read in a single batch.
+            modem.send(
+                make_received_message(b'\x11\x01') +
+                make_received_message(b'\x13\x01'),
+            )
+
+            return [
+                await asyncio.wait_for(queue.get(), 1, loop=loop)
+                for _ in range(2)
+            ]
+
+    messages = loop.run_until_complete(read())
+
+    assert len(emitted) == 2
+    assert [
+        message.insteon_message.command_bytes for message in messages
+    ] == [b'\x11\x01', b'\x13\x01']
+
+
+def test_with_timeout_no_reply(loop, modem, plm):
+    subscribers = dict(plm._dispatcher._subscribers)
+
+    with pytest.raises(CommandTimeout) as error:
+        loop.run_until_complete(
+            plm.id_request(Identity(DEVICE_IDENTITY), timeout=0.05),
+        )
+
+    assert isinstance(error.value, asyncio.TimeoutError)
+    assert error.value.operation == 'id_request'
+    assert error.value.timeout == 0.05
+
+    # The expected reply and the subscriptions were released.
+    assert plm._correlator._expectations == {}
+    assert plm._dispatcher._subscribers == subscribers
+
+
+def test_with_timeout_no_ack(loop, modem, plm):
+    subscribers = dict(plm._dispatcher._subscribers)
+    modem.handlers[CommandCode.send_standard_or_extended_message] = \
+        lambda frame: b''
+
+    with pytest.raises(CommandTimeout) as error:
+        loop.run_until_complete(
+            plm.light_on(Identity(DEVICE_IDENTITY), timeout=0.05),
+        )
+
+    assert error.value.operation == 'light_on'
+    assert plm._dispatcher._subscribers == subscribers
+
+    # The write lock was released.
+    info = loop.run_until_complete(plm.get_info(timeout=1))
+
+    assert info['identity'] == Identity(PLM_IDENTITY)
+
+
+def run_monitor(loop, modem, plm, data, count, on_event, **kwargs):
+    received = []
+
+    async def on_event_callback(insteon_message):
+        await on_event(insteon_message)
+        received.append(insteon_message)
+
+    async def run():
+        task = asyncio.ensure_future(
+            plm.monitor(on_event_callback=on_event_callback, **kwargs),
+            loop=loop,
+        )
+
+        try:
+            await asyncio.sleep(0.01, loop=loop)
+            modem.send(data)
+
+            while len(received) < count:
+                await asyncio.sleep(0.01, loop=loop)
+        finally:
+            plm.interrupt()
+            await task
+
+    loop.run_until_complete(asyncio.wait_for(run(), 5, loop=loop))
+
+    return received
+
+
+def test_monitor_sender_ordering(loop, modem, plm):
+    async def on_event(insteon_message):
+        # Messages from the first device take longer to handle.
+        if insteon_message.sender == Identity(DEVICE_IDENTITY):
+            await asyncio.sleep(0.005, loop=loop)
+
+    data = b''.join(
+        make_received_message(command=bytes([0x11, index]), sender=sender)
+        for index in range(10)
+        for sender in (DEVICE_IDENTITY, OTHER_DEVICE_IDENTITY)
+    )
+    received = run_monitor(
+        loop,
+        modem,
+        plm,
+        data,
+        count=20,
+        on_event=on_event,
+        workers=4,
+    )
+
+    for sender in (DEVICE_IDENTITY, OTHER_DEVICE_IDENTITY):
+        assert [
+            insteon_message.command_bytes[1]
+            for insteon_message in received
+            if insteon_message.sender == Identity(sender)
+        ] == list(range(10))
+
+
+def test_monitor_backpressure(loop, modem, plm):
+    async def on_event(insteon_message):
+        await asyncio.sleep(0.005, loop=loop)
+
+    data = b''.join(
+        make_received_message(command=bytes([0x11, index]))
+        for index in range(20)
+    )
+    received = run_monitor(
+        loop,
+        modem,
+        plm,
+        data,
+        count=20,
+        on_event=on_event,
+        workers=1,
+        maxsize=2,
+    )
+
+    # Nothing was dropped, and the reading resumed once the worker caught
+    # up.
+    assert [
+        insteon_message.command_bytes[1] for insteon_message in received
+    ] == list(range(20))
+    assert plm.metrics['reading_paused'] >= 1
+    assert not plm._reading_paused
+
+
+def make_all_link_records_handler(count, delay):
+    records = []
+
+    def handler(frame):
+        if frame[1] == CommandCode.get_first_all_link_record:
+            records[:] = range(count)
+
+        time.sleep(delay)
+
+        if not records:
+            return frame + b'\x15'
+
+        index = records.pop(0)
+
+        return frame + b'\x06' + b'\x02\x57\xa2\x01' + \
+            DEVICE_IDENTITY[:2] + bytes([index]) + b'\x01\x20\x41'
+
+    return handler
+
+
+def test_get_all_link_records_step_timeout(loop, modem, plm):
+    handler = make_all_link_records_handler(count=5, delay=0.02)
+    modem.handlers[CommandCode.get_first_all_link_record] = handler
+    modem.handlers[CommandCode.get_next_all_link_record] = handler
+
+    # The whole walk takes longer than each step.
+    controllers, responders = loop.run_until_complete(
+        plm.get_all_link_records(step_timeout=0.08),
+    )
+
+    assert len(controllers) == 5
+    assert responders == []
+
+
+def test_get_all_link_records_step_timeout_expired(loop, modem, plm):
+    modem.handlers[CommandCode.get_first_all_link_record] = \
+        make_all_link_records_handler(count=5, delay=0)
+    modem.handlers[CommandCode.get_next_all_link_record] = lambda frame: b''
+
+    with pytest.raises(CommandTimeout) as error:
+        loop.run_until_complete(plm.get_all_link_records(step_timeout=0.05))
+
+    assert error.value.operation == 'get_all_link_records'
+    assert error.value.timeout == 0.05
+
+
+def test_write_read_retry_releases_write_lock(loop, modem, plm):
+    command_code = CommandCode.send_standard_or_extended_message
+    modem.naks = 1
+    completed = []
+
+    async def send():
+        await plm.write_read(
+            command_code=command_code,
+            body=DEVICE_IDENTITY + b'\x0f\x11\xff',
+            command_codes=[command_code],
+            retry_policy=RetryPolicy(initial_delay=0.1, jitter=0),
+        )
+        completed.append('send')
+
+    async def get_info():
+        # Sent while the first command waits for its retry.
+        await asyncio.sleep(0.03, loop=loop)
+        await plm.get_info()
+        completed.append('get_info')
+
+    loop.run_until_complete(asyncio.wait_for(
+        asyncio.gather(send(), get_info(), loop=loop),
+        5,
+        loop=loop,
+    ))
+
+    assert completed == ['get_info', 'send']
+    assert [frame[1] for frame in modem.received[-3:]] == [
+        command_code,
+        CommandCode.get_im_info,
+        command_code,
+    ]
+    assert plm.metrics[('retries', command_code)] == 1
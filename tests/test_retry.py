@@ -0,0 +1,53 @@
+"""
+Tests for the retry policies.
+"""
+
+from pysteon.retry import RetryPolicy
+
+
+def test_retry_policy_get_delay():
+    policy = RetryPolicy(
+        initial_delay=0.1,
+        max_delay=1.0,
+        multiplier=2.0,
+        jitter=0,
+    )
+
+    assert policy.get_delay(1) == 0.1
+    assert policy.get_delay(2) == 0.2
+    assert policy.get_delay(3) == 0.4
+    assert policy.get_delay(10) == 1.0
+    assert policy.get_delay(100000) == 1.0
+
+
+def test_retry_policy_get_delay_jitter():
+    policy = RetryPolicy(initial_delay=1.0, jitter=0.5)
+
+    for _ in range(100):
+        assert 0.5 <= policy.get_delay(1) <= 1.0
+
+
+def test_retry_policy_max_attempts():
+    policy = RetryPolicy(initial_delay=0.1, jitter=0, max_attempts=3)
+
+    assert policy.next_delay(attempt=1, elapsed=0) == 0.1
+    assert policy.next_delay(attempt=2, elapsed=0) == 0.2
+    assert policy.next_delay(attempt=3, elapsed=0) is None
+
+
+def test_retry_policy_unlimited_attempts():
+    policy = RetryPolicy(max_delay=2.0, jitter=0, max_attempts=None)
+
+    assert policy.next_delay(attempt=1100, elapsed=0) == 2.0
+
+
+def test_retry_policy_deadline():
+    policy = RetryPolicy(
+        initial_delay=0.1,
+        jitter=0,
+        max_attempts=None,
+        deadline=1.0,
+    )
+
+    assert policy.next_delay(attempt=1, elapsed=0.5) == 0.1
+    assert policy.next_delay(attempt=1, elapsed=0.95) is None
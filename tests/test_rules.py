@@ -0,0 +1,58 @@
+"""
+Tests for the automation rules matching.
+"""
+
+import pytest
+
+pytest.importorskip('chromalog')
+
+from pysteon.automation.rules import RuleIndex  # noqa
+from pysteon.objects import (  # noqa
+    DeviceCategory,
+    SecurityHealthSafetySubcatory,
+)
+
+
+def test_rule_index_empty():
+    assert RuleIndex([]).match((1, 2, 3, 4)) == []
+
+
+def test_rule_index_match():
+    index = RuleIndex([
+        (([1], [2], [0x11, 0x12], None), 'a'),
+        ((None, None, None, None), 'b'),
+        (([1], [], [0x13], [4]), 'c'),
+        (([1, 5], [2], None, [4]), 'd'),
+    ])
+
+    assert index.match((1, 2, 0x11, 4)) == ['a', 'b', 'd']
+    assert index.match((1, 2, 0x13, 4)) == ['b', 'c', 'd']
+    assert index.match((5, 2, 0x12, 3)) == ['b']
+    assert index.match((5, 2, 0x12, 4)) == ['b', 'd']
+
+
+def test_rule_index_enums():
+    index = RuleIndex([
+        (
+            (
+                [DeviceCategory.security_health_safety],
+                [SecurityHealthSafetySubcatory.motion_sensor],
+                [0x11],
+                None,
+            ),
+            'motion',
+        ),
+    ])
+
+    assert index.match((
+        DeviceCategory.security_health_safety,
+        SecurityHealthSafetySubcatory.motion_sensor,
+        0x11,
+        1,
+    )) == ['motion']
+    assert index.match((
+        DeviceCategory.security_health_safety,
+        SecurityHealthSafetySubcatory.open_close_sensor,
+        0x11,
+        1,
+    )) == []
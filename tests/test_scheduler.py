@@ -0,0 +1,155 @@
+"""
+Tests for the automation timers.
+"""
+
+import asyncio
+import pytest
+
+pytest.importorskip('chromalog')
+
+from pysteon.automation.scheduler import Scheduler  # noqa
+
+
+@pytest.fixture
+def scheduler(loop):
+    scheduler = Scheduler(loop=loop)
+    yield scheduler
+    scheduler.close()
+
+
+def test_scheduler_order(loop, scheduler):
+    calls = []
+
+    scheduler.call_later(0.03, calls.append, 'c')
+    scheduler.call_later(0.01, calls.append, 'a')
+    scheduler.call_later(0.02, calls.append, 'b')
+    scheduler.call_later(0.01, calls.append, 'a2')
+
+    loop.run_until_complete(asyncio.sleep(0.05, loop=loop))
+
+    assert calls == ['a', 'a2', 'b', 'c']
+    assert len(scheduler) == 0
+
+
+def test_scheduler_cancel(loop, scheduler):
+    calls = []
+
+    timer = scheduler.call_later(0.01, calls.append, 'a')
+    scheduler.call_later(0.02, calls.append, 'b')
+    timer.cancel()
+
+    loop.run_until_complete(asyncio.sleep(0.03, loop=loop))
+
+    assert calls == ['b']
+
+
+def test_scheduler_coroutine_and_errors(loop, scheduler):
+    calls = []
+
+    async def callback():
+        calls.append('coroutine')
+
+    def failing():
+        raise RuntimeError
+
+    scheduler.call_later(0, failing)
+    scheduler.call_later(0, callback)
+
+    loop.run_until_complete(asyncio.sleep(0.01, loop=loop))
+
+    assert calls == ['coroutine']
+
+
+def test_scheduler_close(loop, scheduler):
+    calls = []
+
+    scheduler.call_later(0.01, calls.append, 'a')
+    scheduler.close()
+
+    loop.run_until_complete(asyncio.sleep(0.02, loop=loop))
+
+    assert calls == []
+    assert len(scheduler) == 0
+
+
+def test_scheduler_rearm(loop, scheduler):
+    calls = []
+
+    timer = scheduler.call_later(0.02, calls.append, 'a')
+
+    async def run():
+        for _ in range(3):
+            await asyncio.sleep(0.01, loop=loop)
+            timer.rearm(0.02)
+
+        assert calls == []
+        assert timer.pending
+
+        await asyncio.sleep(0.03, loop=loop)
+
+        assert calls == ['a']
+        assert not timer.pending
+
+        # Rearming a timer that fired schedules it again.
+        timer.rearm(0)
+        await asyncio.sleep(0.01, loop=loop)
+
+    loop.run_until_complete(run())
+
+    assert calls == ['a', 'a']
+
+
+def test_scheduler_reschedule_earlier(loop, scheduler):
+    calls = []
+
+    timer = scheduler.call_later(10, calls.append, 'a')
+    timer.reschedule(loop.time() + 0.01)
+
+    assert len(scheduler) == 1
+
+    loop.run_until_complete(asyncio.sleep(0.02, loop=loop))
+
+    assert calls == ['a']
+    assert len(scheduler) == 0
+
+
+def test_scheduler_many_timers(loop, scheduler):
+    calls = []
+    timers = [
+        scheduler.call_later(0.01 + index * 1e-6, calls.append, index)
+        for index in range(10000)
+    ]
+
+    for timer in timers[:6000]:
+        timer.cancel()
+
+    # Cancelled timers are compacted away.
+    assert len(scheduler) == 4000
+    assert len(scheduler._entries) < 10000
+
+    loop.run_until_complete(asyncio.sleep(0.05, loop=loop))
+
+    assert calls == list(range(6000, 10000))
+
+
+def test_scheduler_cron(loop, scheduler):
+    calls = []
+
+    timer = scheduler.call_cron('* * * * *', calls.append, 'a')
+    occurrence = timer.occurrence
+
+    assert timer.pending
+    assert 0 < timer.when - loop.time() <= 60
+
+    # Fire it right away: it is scheduled for the following minute.
+    timer.reschedule(loop.time())
+    loop.run_until_complete(asyncio.sleep(0.01, loop=loop))
+
+    assert calls == ['a']
+    assert timer.pending
+    assert (timer.occurrence - occurrence).total_seconds() == 60
+
+    timer.cancel()
+
+    assert not timer.pending
+    assert len(scheduler) == 0
@@ -0,0 +1,73 @@
+"""
+Tests for the events statistics.
+"""
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from pysteon.objects import Identity  # noqa
+from pysteon.stats import (  # noqa
+    GapsStatistics,
+    filter_columns,
+    get_device_counts,
+    get_hourly_histogram,
+    get_inter_event_gaps,
+)
+
+COLUMNS = {
+    'timestamp': numpy.array(
+        [0, 3600, 3610, 7200, 7230, 90000],
+        dtype='<i8',
+    ) * 1000000,
+    'sender': numpy.array([1, 2, 1, 1, 2, 3], dtype='<u4'),
+    'command': numpy.array([0x1101] * 6, dtype='<u2'),
+    'flags': numpy.array([0xcb] * 6, dtype='<u1'),
+}
+
+
+def test_filter_columns():
+    columns = filter_columns(COLUMNS, since=3600, until=7230)
+
+    assert columns['sender'].tolist() == [2, 1, 1]
+
+
+def test_get_device_counts():
+    assert get_device_counts(COLUMNS) == [
+        (Identity(b'\x00\x00\x01'), 3),
+        (Identity(b'\x00\x00\x02'), 2),
+        (Identity(b'\x00\x00\x03'), 1),
+    ]
+
+
+def test_get_hourly_histogram():
+    histogram = get_hourly_histogram(COLUMNS, utc_offset=3600)
+
+    assert histogram[1] == 1
+    assert histogram[2] == 3
+    assert histogram[3] == 2
+    assert sum(histogram) == 6
+
+
+def test_get_inter_event_gaps():
+    assert get_inter_event_gaps(COLUMNS) == {
+        Identity(b'\x00\x00\x01'): GapsStatistics(
+            count=2,
+            mean=3600.0,
+            minimum=3590.0,
+            maximum=3610.0,
+        ),
+        Identity(b'\x00\x00\x02'): GapsStatistics(
+            count=1,
+            mean=3630.0,
+            minimum=3630.0,
+            maximum=3630.0,
+        ),
+    }
+
+
+def test_get_inter_event_gaps_unordered():
+    order = [5, 3, 1, 0, 4, 2]
+    columns = {name: values[order] for name, values in COLUMNS.items()}
+
+    assert get_inter_event_gaps(columns) == get_inter_event_gaps(COLUMNS)
@@ -0,0 +1,126 @@
+"""
+Tests for the serial transports.
+"""
+
+import asyncio
+import os
+import pytest
+import threading
+import tty
+
+from pysteon.messaging import CommandCode
+from pysteon.transport import LoopSerialTransport
+
+MESSAGE = b'\x02\x50\x11\x22\x33\x44\x85\x11\x2b\x11\x01'
+OTHER_MESSAGE = b'\x02\x50\x11\x22\x33\x44\x85\x11\x2b\x13\x01'
+
+
+class PseudoSerial(object):
+    """
+    The slave side of a pseudo-terminal, exposed like a serial port.
+    """
+
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        os.set_blocking(self.slave, False)
+
+    def fileno(self):
+        return self.slave
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+@pytest.fixture
+def serial():
+    serial = PseudoSerial()
+    yield serial
+    serial.close()
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+@pytest.fixture
+def transport(loop, serial, batches):
+    transport = LoopSerialTransport(
+        serial=serial,
+        loop=loop,
+        on_messages=batches.append,
+    )
+    yield transport
+    transport.close()
+
+
+def run_until(loop, predicate, timeout=1.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.005)
+
+    loop.run_until_complete(asyncio.wait_for(wait(), timeout))
+
+
+def test_loop_transport_read(loop, serial, transport, batches):
+    # The second message arrives in two parts.
+    os.write(serial.master, MESSAGE + OTHER_MESSAGE[:4])
+    run_until(loop, lambda: len(batches) == 1)
+    os.write(serial.master, OTHER_MESSAGE[4:])
+    run_until(loop, lambda: len(batches) == 2)
+
+    messages = [message for batch in batches for message in batch]
+
+    assert [message.command_code for message in messages] == [
+        CommandCode.standard_message_received,
+        CommandCode.standard_message_received,
+    ]
+    assert [bytes(message.body) for message in messages] == [
+        MESSAGE[2:],
+        OTHER_MESSAGE[2:],
+    ]
+
+
+def test_loop_transport_partial_write(loop, serial, transport):
+    # Much more than the pseudo-terminal buffer can hold.
+    data = bytes(range(256)) * 4096
+    transport.write(data)
+
+    assert transport._write_buffer
+
+    received = bytearray()
+
+    def read():
+        while len(received) < len(data):
+            received.extend(os.read(serial.master, 65536))
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    run_until(loop, lambda: not transport._write_buffer, timeout=5.0)
+    thread.join(5.0)
+
+    assert received == data
+
+
+def test_loop_transport_pause_resume(loop, serial, transport, batches):
+    transport.pause_reading()
+    os.write(serial.master, MESSAGE)
+    loop.run_until_complete(asyncio.sleep(0.05))
+
+    assert batches == []
+
+    transport.resume_reading()
+    run_until(loop, lambda: batches)
+
+    assert [bytes(message.body) for message in batches[0]] == [MESSAGE[2:]]
+
+    # A closed transport never resumes reading.
+    transport.close()
+    transport.resume_reading()
+    os.write(serial.master, MESSAGE)
+    loop.run_until_complete(asyncio.sleep(0.05))
+
+    assert len(batches) == 1